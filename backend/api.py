@@ -0,0 +1,610 @@
+"""REST routes of the web process, registered on the app by create_app()"""
+import math
+import os
+import logging
+from datetime import datetime, timedelta
+from flask import Blueprint, Response, current_app, request, jsonify, stream_with_context
+from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
+from bson.objectid import ObjectId
+from pymongo import ASCENDING, DESCENDING, ReturnDocument
+from pymongo.errors import BulkWriteError
+
+from services.alert_index import alert_index
+from services.condition_engine import build_alert
+from services.login_limiter import login_limiter
+from services.password_hasher import HasherBusy, password_hasher
+from services.quote_cache import QuoteCache
+from services.quote_service import quote_cache, quote_engine, rate_governor, tick_store, tick_history_seconds
+from services.rate_governor import RateLimited
+from services.symbol_catalog import symbol_catalog
+from services.user_cache import user_cache
+from utils.extensions import mongo
+from utils.helpers import decode_cursor, encode_cursor
+from utils.metrics import CONTENT_TYPE, registry
+
+logger = logging.getLogger(__name__)
+
+api = Blueprint("api", __name__)
+
+def cached_json(kind, load):
+    """JSON response for the current user's ``kind`` from the per-user cache.
+
+    ``load()`` returns (payload, headers) on a miss. Requests whose
+    If-None-Match holds the current ETag get an empty 304.
+    """
+    def render():
+        payload, headers = load()
+        return current_app.json.dumps(payload).encode(), headers
+
+    email = get_jwt_identity()
+    cached = user_cache.get(kind, email, render)
+    if request.if_none_match.contains(cached.etag):
+        response = current_app.response_class(status=304)
+    else:
+        response = current_app.response_class(cached.body, mimetype="application/json")
+        response.headers.update(cached.headers)
+    response.set_etag(cached.etag)
+    # Browsers must revalidate, which is exactly the conditional GET above
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response
+
+# ============== LIST PAGINATION ============== #
+ALERTS_PAGE_SIZE = 100
+BULK_MAX_ITEMS = int(os.getenv("BULK_MAX_ITEMS", 500))
+HISTORY_PAGE_SIZE = 10
+MAX_PAGE_SIZE = 1000
+EPOCH = datetime(1970, 1, 1)
+
+# Only the fields the list responses return
+ALERT_LIST_FIELDS = {"symbol": 1, "target_price": 1, "condition": 1, "params": 1,
+                     "triggered": 1, "created_at": 1}
+HISTORY_LIST_FIELDS = {"symbol": 1, "target_price": 1, "actual_price": 1, "condition": 1,
+                       "params": 1, "triggered_at": 1}
+
+def alert_json(alert):
+    return {
+        "_id": str(alert["_id"]),
+        "symbol": alert["symbol"],
+        "target_price": alert.get("target_price"),
+        "condition": alert["condition"],
+        "params": alert.get("params"),
+        "triggered": alert.get("triggered", False),
+        "created_at": alert["created_at"]
+    }
+
+def history_json(entry):
+    return {
+        "symbol": entry["symbol"],
+        "target_price": entry.get("target_price"),
+        "actual_price": entry["actual_price"],
+        "condition": entry["condition"],
+        "params": entry.get("params"),
+        "triggered_at": entry["triggered_at"]
+    }
+
+def list_filters(email, args):
+    """Mongo filter for the symbol/condition query params shared by both lists"""
+    query = {"email": email}
+    if args.get("symbol"):
+        query["symbol"] = args["symbol"].upper()
+    if args.get("condition"):
+        query["condition"] = args["condition"]
+    return query
+
+def cursor_object_id(value):
+    if not ObjectId.is_valid(value):
+        raise ValueError("Invalid cursor")
+    return ObjectId(value)
+
+def find_alerts(email, args):
+    """Cursor over ``email``'s alerts matching ``args``, oldest first, after ``args['cursor']``"""
+    query = list_filters(email, args)
+    if "triggered" in args:
+        if args["triggered"] not in ("true", "false"):
+            raise ValueError("triggered must be 'true' or 'false'")
+        query["triggered"] = args["triggered"] == "true"
+    if args.get("cursor"):
+        (last_id,) = decode_cursor(args["cursor"])
+        query["_id"] = {"$gt": cursor_object_id(last_id)}
+    return mongo.db.alerts.find(query, ALERT_LIST_FIELDS, sort=[("_id", ASCENDING)])
+
+def find_history(email, args):
+    """Cursor over ``email``'s alert history matching ``args``, newest first, after ``args['cursor']``"""
+    query = list_filters(email, args)
+    if args.get("cursor"):
+        millis, last_id = decode_cursor(args["cursor"], 2)
+        try:
+            triggered_at = EPOCH + timedelta(milliseconds=int(millis))
+        except ValueError:
+            raise ValueError("Invalid cursor")
+        last_id = cursor_object_id(last_id)
+        query["$or"] = [
+            {"triggered_at": {"$lt": triggered_at}},
+            {"triggered_at": triggered_at, "_id": {"$lt": last_id}},
+        ]
+    return mongo.db.alert_history.find(query, HISTORY_LIST_FIELDS,
+                                       sort=[("triggered_at", DESCENDING), ("_id", DESCENDING)])
+
+def page(cursor, args, default_limit, serialize, next_cursor):
+    """(items, headers) for one page; X-Next-Cursor is set when more items follow"""
+    limit = args.get("limit", default_limit)
+    try:
+        limit = min(max(int(limit), 1), MAX_PAGE_SIZE)
+    except (TypeError, ValueError):
+        raise ValueError("limit must be a number")
+    docs = list(cursor.limit(limit + 1))
+    headers = {}
+    if len(docs) > limit:
+        docs = docs[:limit]
+        headers["X-Next-Cursor"] = next_cursor(docs[-1])
+    return [serialize(doc) for doc in docs], headers
+
+def ndjson(cursor, serialize):
+    """Stream every document from ``cursor`` as newline-delimited JSON"""
+    def generate():
+        for doc in cursor.batch_size(500):
+            yield current_app.json.dumps(serialize(doc)) + "\n"
+    # The body is generated after the view returns; keep the app context for current_app
+    return current_app.response_class(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+def alert_cursor(alert):
+    return encode_cursor(alert["_id"])
+
+def history_cursor(entry):
+    return encode_cursor((entry["triggered_at"] - EPOCH) // timedelta(milliseconds=1), entry["_id"])
+
+def list_response(find, default_limit, serialize, next_cursor):
+    """Paged JSON list, or an NDJSON export with ?format=ndjson, for the current user"""
+    user_email = get_jwt_identity()
+    try:
+        cursor = find(user_email, request.args)
+        if request.args.get("format") == "ndjson":
+            return ndjson(cursor, serialize)
+        items, headers = page(cursor, request.args, default_limit, serialize, next_cursor)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(items), 200, headers
+
+# ============== AUTH ROUTES ============== #
+def retry_later(error, status, retry_after):
+    """Error response with a Retry-After header for a refused auth request"""
+    response = jsonify({"error": error})
+    response.headers["Retry-After"] = str(int(retry_after) + 1)
+    return response, status
+
+@api.route('/api/auth/register', methods=['POST'])
+def register():
+    try:
+        data = request.get_json()
+        email = data.get('email')
+        password = data.get('password')
+
+        if not email or not password:
+            return jsonify({"error": "Email and password required"}), 400
+
+        if mongo.db.users.find_one({"email": email}):
+            return jsonify({"error": "User already exists"}), 409
+
+        user = {
+            "email": email,
+            "password": password_hasher.hash(password),
+            "created_at": datetime.utcnow()
+        }
+        mongo.db.users.insert_one(user)
+
+        return jsonify({
+            "message": "User created successfully",
+            "email": email
+        }), 201
+    except HasherBusy as e:
+        return retry_later("Server busy, please try again", 503, e.retry_after)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@api.route("/api/auth/login", methods=["POST"])
+def login():
+    try:
+        data = request.get_json()
+        email = data.get("email")
+        password = data.get("password")
+
+        if not email or not password:
+            return jsonify({"error": "Email and password required"}), 400
+
+        # Throttled clients are turned away before the database or the KDF
+        ip = request.remote_addr or ""
+        retry_after = login_limiter.retry_after(ip, email)
+        if retry_after:
+            return retry_later("Too many failed login attempts", 429, retry_after)
+
+        user = mongo.db.users.find_one({"email": email})
+        if not user or not password_hasher.verify(user["password"], password):
+            login_limiter.record_failure(ip, email)
+            return jsonify({"error": "Invalid credentials"}), 401
+        login_limiter.reset(email)
+
+        if password_hasher.needs_rehash(user["password"]):
+            # Upgrade to the configured hash settings while the password is at hand
+            try:
+                mongo.db.users.update_one({"_id": user["_id"], "password": user["password"]},
+                                          {"$set": {"password": password_hasher.hash(password)}})
+            except HasherBusy:
+                pass
+
+        access_token = create_access_token(identity=email)
+        return jsonify({
+            "access_token": access_token,
+            "token_type": "bearer",
+            "email": email,
+            "message": "Login successful"
+        }), 200
+    except HasherBusy as e:
+        return retry_later("Server busy, please try again", 503, e.retry_after)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@api.route('/api/auth/verify', methods=['GET'])
+@jwt_required()
+def verify_token():
+    return jsonify({"valid": True}), 200
+
+# ============== ALERT ROUTES ============== #
+@api.route("/api/alerts", methods=["GET", "POST", "DELETE"])
+@jwt_required()
+def manage_alerts():
+    user_email = get_jwt_identity()
+    
+    if request.method == "GET":
+        if not request.args:
+            # The dashboard's default view: the first page, cached per user
+            return cached_json("alerts", lambda: page(
+                find_alerts(user_email, {}), {}, ALERTS_PAGE_SIZE, alert_json, alert_cursor))
+        return list_response(find_alerts, ALERTS_PAGE_SIZE, alert_json, alert_cursor)
+        
+    if request.method == "POST":
+        alert, error = build_alert(user_email, request.get_json(), tick_history_seconds)
+        if error:
+            return jsonify({"error": error}), 400
+        mongo.db.alerts.insert_one(alert)
+        alert_index.add(alert)
+        user_cache.invalidate(user_email, "alerts")
+        return jsonify({"message": "Alert created successfully"}), 201
+        
+    if request.method == "DELETE":
+        data = request.get_json()
+        result = mongo.db.alerts.delete_one({
+            "_id": ObjectId(data["alert_id"]),
+            "email": user_email
+        })
+        if result.deleted_count:
+            alert_index.remove(data["alert_id"])
+            user_cache.invalidate(user_email, "alerts")
+        return jsonify({"message": "Alert deleted successfully"}), 200
+
+def bulk_items(key):
+    """The list under ``key`` (or a bare list) from the request body, or an error"""
+    data = request.get_json(silent=True)
+    items = data.get(key) if isinstance(data, dict) else data
+    if not isinstance(items, list) or not items:
+        return None, f"{key} must be a non-empty list"
+    if len(items) > BULK_MAX_ITEMS:
+        return None, f"At most {BULK_MAX_ITEMS} {key} per request"
+    return items, None
+
+@api.route("/api/alerts/bulk", methods=["POST"])
+@jwt_required()
+def bulk_create_alerts():
+    """Validate and create many alerts with one insert_many; one result per item"""
+    user_email = get_jwt_identity()
+    items, error = bulk_items("alerts")
+    if error:
+        return jsonify({"error": error}), 400
+
+    results = [None] * len(items)
+    valid = []  # (position in request, alert document)
+    for i, item in enumerate(items):
+        alert, error = build_alert(user_email, item, tick_history_seconds)
+        if error:
+            results[i] = {"index": i, "status": "error", "error": error}
+        else:
+            valid.append((i, alert))
+
+    write_errors = {}
+    if valid:
+        try:
+            mongo.db.alerts.insert_many([alert for _, alert in valid], ordered=False)
+        except BulkWriteError as e:
+            # Unordered: everything not listed here was inserted
+            write_errors = {err["index"]: err["errmsg"] for err in e.details.get("writeErrors", [])}
+
+    created = []
+    for n, (i, alert) in enumerate(valid):
+        if n in write_errors:
+            results[i] = {"index": i, "status": "error", "error": write_errors[n]}
+        else:
+            results[i] = {"index": i, "status": "created", "_id": str(alert["_id"])}
+            created.append(alert)
+    if created:
+        alert_index.add_many(created)
+        user_cache.invalidate(user_email, "alerts")
+    return jsonify({
+        "created": len(created),
+        "failed": len(items) - len(created),
+        "results": results
+    }), 201 if created else 400
+
+@api.route('/api/alert-history', methods=['GET'])
+@jwt_required()
+def get_alert_history():
+    """Get past triggered alerts, newest first"""
+    return list_response(find_history, HISTORY_PAGE_SIZE, history_json, history_cursor)
+
+@api.route("/api/stocks/cache-stats", methods=["GET"])
+@jwt_required()
+def quote_cache_stats():
+    """Hit, miss and coalesced counters for the shared quote cache"""
+    return jsonify({**quote_cache.stats(), "rate_governor": rate_governor.stats()}), 200
+
+@api.route("/api/stocks/<symbol>/history", methods=["GET"])
+@jwt_required()
+def get_price_history(symbol):
+    """Recent ticks for a symbol, served from the in-memory tick rings"""
+    try:
+        window = float(request.args.get("window", 3600))
+    except ValueError:
+        return jsonify({"error": "window must be a number of seconds"}), 400
+    if not math.isfinite(window) or window <= 0:
+        return jsonify({"error": "window must be a positive number of seconds"}), 400
+    # Older ticks are not kept in memory
+    window = min(window, tick_history_seconds)
+    timestamps, prices, volumes = tick_store.window(symbol.upper(), window)
+    return jsonify({
+        "symbol": symbol.upper(),
+        "window": window,
+        "timestamps": timestamps.tolist(),
+        "prices": prices.tolist(),
+        "volumes": [None if volume != volume else volume for volume in volumes]
+    }), 200
+
+# Recent SYMBOL_SEARCH answers, served when the rate governor refuses a new call
+search_cache = QuoteCache(ttl=float(os.getenv("SEARCH_CACHE_TTL", 3600)), maxsize=512)
+
+@api.route("/api/stocks/search", methods=["GET"])
+@jwt_required()
+def search_stocks():
+    query = request.args.get("query", "").lower().strip()
+    
+    if not query:
+        return jsonify({"error": "Please enter a search query", "bestMatches": []}), 400
+    
+    # Typeahead is served from the local listing catalogue without an upstream call
+    matches = symbol_catalog.search(query)
+    if matches:
+        return jsonify({"bestMatches": matches, "isMockData": False}), 200
+    
+    cached = search_cache.peek(query)
+    if cached is not None:
+        return jsonify({"bestMatches": cached, "isMockData": False}), 200
+    
+    # Catalogue miss: fall back to Alpha Vantage
+    try:
+        if not os.getenv("ALPHA_VANTAGE_KEY"):
+            raise ValueError("API key not configured")
+        
+        data = quote_engine.search(query)
+        
+        # Check for API rate limit message
+        if "Note" in data and "API call frequency" in data["Note"]:
+            return jsonify({
+                "error": "Daily API limit reached. Using mock data.",
+                "bestMatches": get_mock_data(query),
+                "isMockData": True
+            }), 200
+        
+        # Check for valid response
+        if "bestMatches" in data:
+            search_cache.put(query, data["bestMatches"])
+            return jsonify({
+                "bestMatches": data["bestMatches"],
+                "isMockData": False
+            }), 200
+            
+    except RateLimited as e:
+        # Answer immediately instead of parking the worker until a token frees up
+        stale = search_cache.stale(query)
+        if stale is not None:
+            return jsonify({"bestMatches": stale, "isMockData": False}), 200
+        response = jsonify({
+            "error": f"API rate limit exceeded. Please wait {e.retry_after:.0f} seconds",
+            "bestMatches": get_mock_data(query),
+            "isMockData": True
+        })
+        if e.retry_after != float("inf"):
+            response.headers["Retry-After"] = str(int(e.retry_after) + 1)
+        return response, 429
+    except Exception as e:
+        logger.warning("Symbol search error: %s", e)
+        # Continue to fallback if API fails
+    
+    # Fallback to mock data if API fails
+    return jsonify({
+        "bestMatches": get_mock_data(query),
+        "isMockData": True,
+        "notice": "Showing mock data as API is unavailable"
+    }), 200
+
+def get_mock_data(query):
+    """Returns mock data for testing when API fails"""
+    mock_data = {
+        "hdfc": [
+            {
+                "1. symbol": "HDFCBANK.BSE",
+                "2. name": "HDFC Bank Limited",
+                "3. type": "Equity",
+                "4. region": "India",
+                "5. marketOpen": "09:15",
+                "6. marketClose": "15:30",
+                "7. timezone": "UTC+5.5",
+                "8. currency": "INR",
+                "9. matchScore": "0.8889"
+            },
+            {
+                "1. symbol": "HDFC.NS",
+                "2. name": "Housing Development Finance Corporation Limited",
+                "3. type": "Equity",
+                "4. region": "India",
+                "5. marketOpen": "09:15",
+                "6. marketClose": "15:30",
+                "7. timezone": "UTC+5.5",
+                "8. currency": "INR",
+                "9. matchScore": "0.8571"
+            }
+        ],
+        "reliance": [
+            {
+                "1. symbol": "RELIANCE.BSE",
+                "2. name": "Reliance Industries Limited",
+                "3. type": "Equity",
+                "4. region": "India",
+                "5. marketOpen": "09:15",
+                "6. marketClose": "15:30",
+                "7. timezone": "UTC+5.5",
+                "8. currency": "INR",
+                "9. matchScore": "0.9231"
+            }
+        ],
+        "tata": [
+            {
+                "1. symbol": "TATAMOTORS.BSE",
+                "2. name": "Tata Motors Limited",
+                "3. type": "Equity",
+                "4. region": "India",
+                "5. marketOpen": "09:15",
+                "6. marketClose": "15:30",
+                "7. timezone": "UTC+5.5",
+                "8. currency": "INR",
+                "9. matchScore": "0.8571"
+            }
+        ]
+    }
+    
+    # Find partial matches in mock data
+    results = []
+    for key in mock_data:
+        if query in key:
+            results.extend(mock_data[key])
+    
+    return results if results else []
+
+# ============== WATCHLIST ROUTE ============== #
+@api.route("/api/watchlist", methods=["GET", "POST", "DELETE", "OPTIONS"])
+@jwt_required()
+def watchlist():
+    try:
+        user_email = get_jwt_identity()
+        
+        if request.method == "GET":
+            def load():
+                watchlist = mongo.db.watchlists.find_one({"email": user_email}, {"stocks": 1})
+                return (watchlist.get("stocks", []) if watchlist else []), {}
+            return cached_json("watchlist", load)
+        
+        data = request.get_json()
+        symbol = data.get("symbol")
+        
+        if request.method == "POST":
+            if not symbol:
+                return jsonify({"error": "Symbol required"}), 400
+                
+            mongo.db.watchlists.update_one(
+                {"email": user_email},
+                {"$addToSet": {"stocks": symbol}},
+                upsert=True
+            )
+            user_cache.invalidate(user_email, "watchlist")
+            return jsonify({"message": "Stock added to watchlist"}), 200
+        
+        if request.method == "DELETE":
+            if not symbol:
+                return jsonify({"error": "Symbol required"}), 400
+                
+            mongo.db.watchlists.update_one(
+                {"email": user_email},
+                {"$pull": {"stocks": symbol}}
+            )
+            user_cache.invalidate(user_email, "watchlist")
+            return jsonify({"message": "Stock removed from watchlist"}), 200
+            
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@api.route("/api/watchlist/bulk", methods=["POST"])
+@jwt_required()
+def bulk_add_watchlist():
+    """Add many symbols with one $addToSet/$each; one result per item"""
+    user_email = get_jwt_identity()
+    items, error = bulk_items("symbols")
+    if error:
+        return jsonify({"error": error}), 400
+
+    results, symbols = [], []
+    for i, symbol in enumerate(items):
+        if not isinstance(symbol, str) or not symbol.strip():
+            results.append({"index": i, "status": "error", "error": "Symbol required"})
+            continue
+        results.append({"index": i, "symbol": symbol.strip()})
+        symbols.append(symbol.strip())
+
+    existing = set()
+    if symbols:
+        # The pre-update document tells which symbols were already there, atomically
+        before = mongo.db.watchlists.find_one_and_update(
+            {"email": user_email},
+            {"$addToSet": {"stocks": {"$each": list(dict.fromkeys(symbols))}}},
+            projection={"stocks": 1, "_id": 0},
+            upsert=True,
+            return_document=ReturnDocument.BEFORE
+        )
+        existing = set(before.get("stocks", [])) if before else set()
+        user_cache.invalidate(user_email, "watchlist")
+
+    added = 0
+    for result in results:
+        if "symbol" not in result:
+            continue
+        if result["symbol"] in existing:
+            result["status"] = "exists"
+        else:
+            result["status"] = "added"
+            existing.add(result["symbol"])
+            added += 1
+    return jsonify({"added": added, "results": results}), 200
+
+# ============== METRICS ============== #
+@api.route("/metrics", methods=["GET"])
+def metrics():
+    """Prometheus scrape endpoint for this process"""
+    return Response(registry.render(), content_type=CONTENT_TYPE)
+
+# ============== USER PROFILE ROUTE ============== #
+@api.route("/api/user/profile", methods=["GET", "PUT"])
+@jwt_required()
+def user_profile():
+    user_email = get_jwt_identity()
+    
+    if request.method == "GET":
+        # _id is left out: ObjectId is not JSON serializable
+        return cached_json("profile", lambda: (mongo.db.users.find_one(
+            {"email": user_email}, {"password": 0, "_id": 0}), {}))
+        
+    if request.method == "PUT":
+        data = request.get_json()
+        mongo.db.users.update_one(
+            {"email": user_email},
+            {"$set": {
+                "username": data.get("username"),
+                "phone": data.get("phone")
+            }}
+        )
+        user_cache.invalidate(user_email, "profile")
+        return jsonify({"message": "Profile updated"}), 200
@@ -0,0 +1,253 @@
+"""Replay recorded ticks through the alert checker and the Socket.IO fan-out.
+
+    python backtest.py data/AAPL.csv data/MSFT.csv --alerts alerts.json
+    python backtest.py --recorded --from-db --symbols AAPL,MSFT --start 2024-05-01 --speed 60
+
+Ticks come from CSV/Parquet files (see services.replay_source.load_ticks)
+or, with --recorded, from the ``ticks`` collection. Alerts come from a JSON
+file in the POST /api/alerts/bulk shape, optionally with an ``email`` per
+alert, or with --from-db from the untriggered alerts in MongoDB, which are
+only read. Every distinct tick time is one alert cycle over the symbols
+that ticked, through the same index, price lookups and window conditions
+as the live checker; firings go to the timeline instead of MongoDB and
+email. With --subscribers, Socket.IO test clients follow the replayed
+symbols through PriceHub. --speed 0 (the default) replays as fast as
+possible. The report is printed as JSON and written to --output.
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import sys
+import time
+from datetime import datetime, timezone
+from dotenv import load_dotenv
+
+load_dotenv()
+# Replayed quotes must not be answered from a wall-clock cache, and the
+# replay source is installed below rather than from the environment
+os.environ.update({"QUOTE_CACHE_TTL": "0", "QUOTE_SOURCE": "alphavantage", "TICK_FLUSH_INTERVAL": "0"})
+
+import numpy as np
+from bson.objectid import ObjectId
+from flask import Flask, request
+from flask_socketio import SocketIO
+from pymongo import MongoClient
+from services.alert_index import AlertIndex
+from services.alert_service import AlertChecker
+from services.alert_sync import ALERT_PROJECTION
+from services.condition_engine import build_alert
+from services.price_hub import PriceHub
+from services.quote_service import get_prices, set_quote_source, tick_history_seconds, tick_store
+from services.rate_governor import PRIORITY_UI
+from services.replay_source import ReplaySource, load_recorded_ticks, load_ticks
+from utils.log import configure_logging
+
+logger = logging.getLogger(__name__)
+
+
+class _NoEmail:
+    """Notifier stand-in that counts the emails a live checker would have queued"""
+
+    def __init__(self):
+        self.count = 0
+
+    def notify(self, email, symbol, price, condition, target_price=None, params=None):
+        self.count += 1
+
+
+class BacktestChecker(AlertChecker):
+    """AlertChecker whose firings go to a timeline instead of MongoDB"""
+
+    def __init__(self, index, clock):
+        super().__init__(None, index, notifier=_NoEmail())
+        self.clock = clock
+        self.timeline = []
+
+    def record_firings(self, firings):
+        fired_at = datetime.fromtimestamp(self.clock(), timezone.utc).isoformat()
+        self.timeline.extend({
+            "ts": fired_at,
+            "alert_id": alert["_id"],
+            "email": alert["email"],
+            "symbol": alert["symbol"],
+            "condition": alert["condition"],
+            "target_price": alert.get("target_price"),
+            "params": alert.get("params"),
+            "price": price,
+        } for alert, price in firings)
+        return firings
+
+
+def percentiles(samples, scale=1000.0):
+    """p50/p95/p99/max of ``samples`` (seconds), reported in milliseconds"""
+    if not len(samples):
+        return {}
+    p50, p95, p99 = np.percentile(samples, [50, 95, 99]) * scale
+    return {"p50_ms": round(p50, 3), "p95_ms": round(p95, 3), "p99_ms": round(p99, 3),
+            "max_ms": round(max(samples) * scale, 3)}
+
+
+def load_alerts(args, db):
+    """(alert documents, [rejection messages])"""
+    if args.from_db:
+        return list(db.alerts.find({"triggered": False}, ALERT_PROJECTION)), []
+    with open(args.alerts, encoding="utf-8") as f:
+        items = json.load(f)
+    if isinstance(items, dict):
+        items = items.get("alerts", [])
+    alerts, rejected = [], []
+    for position, item in enumerate(items):
+        alert, error = build_alert(item.get("email", "backtest") if isinstance(item, dict) else None,
+                                   item, tick_history_seconds)
+        if error:
+            rejected.append(f"alert {position}: {error}")
+            continue
+        alert["_id"] = str(item.get("_id") or ObjectId())
+        alerts.append(alert)
+    return alerts, rejected
+
+
+def load_source(args, db):
+    if args.recorded:
+        ticks = load_recorded_ticks(
+            db.ticks,
+            symbols=args.symbols.split(",") if args.symbols else None,
+            start=datetime.fromisoformat(args.start) if args.start else None,
+            end=datetime.fromisoformat(args.end) if args.end else None,
+        )
+    else:
+        ticks = [tick for path in args.files for tick in load_ticks(path)]
+        if args.symbols:
+            wanted = {symbol.upper() for symbol in args.symbols.split(",")}
+            ticks = [tick for tick in ticks if tick[1] in wanted]
+    return ReplaySource(ticks, speed=args.speed, on_quote=tick_store.record)
+
+
+def connect_subscribers(args, hub, symbols):
+    """Socket.IO test clients subscribed to random samples of ``symbols`` through ``hub``"""
+    app = Flask(__name__)
+    socketio = SocketIO(app, async_mode="threading")
+    hub.socketio = socketio
+
+    @socketio.on("subscribe_stocks")
+    def subscribe_stocks(data):
+        hub.subscribe(request.sid, data["symbols"])
+
+    @socketio.on("disconnect")
+    def disconnect(*args):
+        hub.disconnect(request.sid)
+
+    rng = random.Random(args.seed)
+    clients = []
+    for _ in range(args.subscribers):
+        client = socketio.test_client(app)
+        client.emit("subscribe_stocks", {"symbols": rng.sample(symbols, min(args.symbols_per_client, len(symbols)))})
+        clients.append(client)
+    return clients
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backtest alerts against recorded ticks")
+    parser.add_argument("files", nargs="*", help="CSV or Parquet tick files")
+    parser.add_argument("--recorded", action="store_true",
+                        help="replay the ticks collection of --mongo-uri instead of files")
+    parser.add_argument("--symbols", help="comma-separated symbols to keep")
+    parser.add_argument("--start", help="ISO time to replay --recorded ticks from")
+    parser.add_argument("--end", help="ISO time to replay --recorded ticks until")
+    parser.add_argument("--alerts", help="JSON file of alerts to evaluate")
+    parser.add_argument("--from-db", action="store_true", help="evaluate the untriggered alerts in MongoDB")
+    parser.add_argument("--mongo-uri", default=os.getenv("MONGO_URI"))
+    parser.add_argument("--speed", type=float, default=0,
+                        help="replay speed-up over real time; 0 replays as fast as possible")
+    parser.add_argument("--subscribers", type=int, default=0, help="Socket.IO clients following the replay")
+    parser.add_argument("--symbols-per-client", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", default="backtest-results.json")
+    parser.add_argument("--log-level", default="WARNING")
+    args = parser.parse_args()
+    if not (args.alerts or args.from_db):
+        parser.error("give --alerts FILE or --from-db")
+    if not (args.files or args.recorded):
+        parser.error("give tick files or --recorded")
+    configure_logging(level=args.log_level)
+
+    db = None
+    if args.recorded or args.from_db:
+        db = MongoClient(args.mongo_uri).get_default_database()
+    source = load_source(args, db)
+    set_quote_source(source)
+    alerts, rejected = load_alerts(args, db)
+    index = AlertIndex()
+    index.load(alerts)
+    checker = BacktestChecker(index, source.now)
+
+    hub = PriceHub(None, lambda symbols: get_prices(symbols, PRIORITY_UI), ack_timeout=0)
+    clients = connect_subscribers(args, hub, sorted(source.symbols())) if args.subscribers else []
+    for client in clients:
+        client.get_received()
+
+    cycle_times, flush_times = [], []
+    evaluated = frames = 0
+    wall_start = time.perf_counter()
+    for _, symbols in source.replay():
+        evaluated += index.count(symbols)
+        cycle_start = time.perf_counter()
+        checker.run_cycle(symbols)
+        cycle_times.append(time.perf_counter() - cycle_start)
+        if clients:
+            watched = [symbol for symbol in symbols if hub.subscriber_count(symbol)]
+            for symbol, price in get_prices(watched, PRIORITY_UI).items():
+                hub.observe(symbol, price)
+            flush_start = time.perf_counter()
+            hub.flush()
+            flush_times.append(time.perf_counter() - flush_start)
+            frames += sum(len(client.get_received()) for client in clients)
+    wall = time.perf_counter() - wall_start
+    for client in clients:
+        client.disconnect()
+
+    stats = source.stats()
+    replay_span = stats["end"] - stats["start"]
+    report = {
+        "source": {
+            "symbols": stats["symbols"],
+            "ticks": stats["ticks"],
+            "start": datetime.fromtimestamp(stats["start"], timezone.utc).isoformat(),
+            "end": datetime.fromtimestamp(stats["end"], timezone.utc).isoformat(),
+            "speed": args.speed,
+        },
+        "alerts": {
+            "loaded": len(alerts),
+            "rejected": rejected,
+            "fired": len(checker.timeline),
+            "pending": len(index),
+        },
+        "throughput": {
+            "wall_seconds": round(wall, 4),
+            "replay_seconds": replay_span,
+            "speedup": round(replay_span / wall, 1) if wall else None,
+            "ticks_replayed": stats["ticks_replayed"],
+            "ticks_per_second": round(stats["ticks_replayed"] / wall, 1) if wall else None,
+            "cycles": len(cycle_times),
+            "alerts_evaluated": evaluated,
+            "alerts_evaluated_per_second": round(evaluated / wall, 1) if wall else None,
+            "cycle": percentiles(cycle_times),
+        },
+        "broadcast": {
+            "subscribers": len(clients),
+            "frames_sent": hub.frames_sent,
+            "frames_received": frames,
+            "flush": percentiles(flush_times),
+        },
+        "timeline": checker.timeline,
+    }
+    text = json.dumps(report, indent=2, default=str)
+    with open(args.output, "w", encoding="utf-8") as f:
+        f.write(text + "\n")
+    print(text)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
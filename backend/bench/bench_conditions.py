@@ -0,0 +1,88 @@
+"""Benchmark: window-based alert evaluation throughput.
+
+Builds a ConditionEngine with N mixed-type alerts spread over S symbols, gives
+every symbol a full tick ring of synthetic prices, and times one evaluation
+pass over all symbols against a tick budget.
+
+    python bench/bench_conditions.py --alerts 100000 --symbols 500 --budget 1.0
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.condition_engine import CONDITION_PARAMS, ConditionEngine
+
+def make_alerts(count, symbols, history, rng):
+    conditions = list(CONDITION_PARAMS)
+    for i in range(count):
+        condition = conditions[i % len(conditions)]
+        window = float(rng.integers(60, history))
+        params = {
+            "pct_change": {"window": window, "threshold": float(rng.uniform(-5, 5))},
+            "ma_cross": {"short_window": window / 4, "long_window": window,
+                         "direction": "above" if i % 2 else "below"},
+            "high_break": {"window": window},
+            "low_break": {"window": window},
+            "volume_spike": {"window": window, "multiplier": float(rng.uniform(1.5, 5))},
+        }[condition]
+        yield {
+            "_id": f"a{i}",
+            "email": f"user{i % 1000}@example.com",
+            "symbol": symbols[i % len(symbols)],
+            "condition": condition,
+            "params": params,
+        }
+
+def make_ticks(ticks, spacing, rng):
+    timestamps = np.arange(ticks, dtype=np.float64) * spacing
+    prices = 100 * np.exp(np.cumsum(rng.normal(0, 0.001, ticks)))
+    volumes = np.cumsum(rng.integers(100, 10000, ticks)).astype(np.float64)
+    return timestamps, prices, volumes
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--alerts", type=int, default=100000)
+    parser.add_argument("--symbols", type=int, default=500)
+    parser.add_argument("--ticks", type=int, default=4320, help="ticks held per symbol")
+    parser.add_argument("--spacing", type=float, default=5.0, help="seconds between ticks")
+    parser.add_argument("--budget", type=float, default=1.0, help="tick budget in seconds")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    symbols = [f"SYM{i}" for i in range(args.symbols)]
+    alerts = list(make_alerts(args.alerts, symbols, int(args.ticks * args.spacing * 0.9), rng))
+    windows = {symbol: make_ticks(args.ticks, args.spacing, rng) for symbol in symbols}
+
+    timings, fired = [], 0
+    for _ in range(args.repeat):
+        engine = ConditionEngine()
+        engine.load(alerts)
+        # Build the per-symbol parameter arrays up front, as a running checker would have
+        for symbol in symbols:
+            engine.max_window(symbol)
+        start = time.perf_counter()
+        fired = sum(len(engine.evaluate(symbol, *windows[symbol])) for symbol in symbols)
+        timings.append(time.perf_counter() - start)
+
+    best = min(timings)
+    print(json.dumps({
+        "alerts": args.alerts,
+        "symbols": args.symbols,
+        "ticks_per_symbol": args.ticks,
+        "fired": fired,
+        "best_seconds": round(best, 4),
+        "median_seconds": round(sorted(timings)[len(timings) // 2], 4),
+        "alerts_per_second": round(args.alerts / best),
+        "budget_seconds": args.budget,
+        "within_budget": best <= args.budget,
+    }, indent=2))
+
+if __name__ == "__main__":
+    main()
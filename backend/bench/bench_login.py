@@ -0,0 +1,138 @@
+"""Benchmark: a login burst against the rest of the API.
+
+Seeds users, then fires --burst concurrent logins while --background
+clients keep calling GET /api/alerts, and reports latency percentiles for
+both next to the same background load with no burst. Each hashing mode is
+run in turn: "inline" hashes on the request thread as before, "pool" uses
+the bounded PasswordHasher pool and answers 503 past its queue.
+
+    python bench/bench_login.py --burst 200 --concurrency 64 --workers 2 --queue-size 16
+
+Uses mongomock unless --mongo-uri names a real server (its users collection
+is wiped first). Needs the packages in bench/requirements.txt.
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from werkzeug.security import generate_password_hash
+
+from bench.run_benchmarks import import_app, percentiles
+
+PASSWORD = "correct horse battery staple"
+
+
+def background_load(app, token, clients, stop):
+    """Run ``clients`` threads calling GET /api/alerts until ``stop`` is set; returns their latencies"""
+    latencies = []
+
+    def loop():
+        client = app.app.test_client()
+        headers = {"Authorization": f"Bearer {token}"}
+        while not stop.is_set():
+            start = time.perf_counter()
+            client.get("/api/alerts?limit=20", headers=headers)
+            latencies.append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=loop, daemon=True) for _ in range(clients)]
+    for thread in threads:
+        thread.start()
+    return threads, latencies
+
+
+def run_mode(app, args, emails, token, mode):
+    from services.password_hasher import PasswordHasher
+
+    app.api.password_hasher = PasswordHasher(method=args.method, workers=args.workers if mode == "pool" else 0,
+                                             queue_size=args.queue_size)
+    local = threading.local()
+
+    def login(email):
+        client = getattr(local, "client", None)
+        if client is None:
+            client = local.client = app.app.test_client()
+        start = time.perf_counter()
+        response = client.post("/api/auth/login", json={"email": email, "password": PASSWORD})
+        return time.perf_counter() - start, response.status_code
+
+    stop = threading.Event()
+    threads, idle = background_load(app, token, args.background, stop)
+    time.sleep(args.idle_seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    stop = threading.Event()
+    threads, busy = background_load(app, token, args.background, stop)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(args.concurrency) as pool:
+        results = list(pool.map(login, (emails[i % len(emails)] for i in range(args.burst))))
+    wall = time.perf_counter() - start
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    statuses = {}
+    for _, status in results:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+    return {
+        "burst_seconds": round(wall, 3),
+        "login_status": statuses,
+        "login_ok": percentiles([elapsed for elapsed, status in results if status == 200]),
+        "login_all": percentiles([elapsed for elapsed, _ in results]),
+        "other_routes_idle": {"requests": len(idle), **percentiles(idle)},
+        "other_routes_during_burst": {"requests": len(busy), **percentiles(busy)},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Login burst benchmark")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--burst", type=int, default=200, help="logins in the burst")
+    parser.add_argument("--concurrency", type=int, default=64, help="logins in flight at once")
+    parser.add_argument("--background", type=int, default=4, help="clients calling other routes")
+    parser.add_argument("--idle-seconds", type=float, default=2.0, help="background-only baseline length")
+    parser.add_argument("--workers", type=int, default=min(4, os.cpu_count() or 1))
+    parser.add_argument("--queue-size", type=int, default=16)
+    parser.add_argument("--method", default="pbkdf2:sha256:600000")
+    parser.add_argument("--modes", default="inline,pool")
+    parser.add_argument("--mongo-uri")
+    args = parser.parse_args()
+
+    os.environ.setdefault("JWT_SECRET_KEY", "bench-secret-key-that-is-long-enough-for-hs256")
+    os.environ.setdefault("MONGO_URI", args.mongo_uri or "mongodb://localhost:27017/bench")
+    app = import_app(args.mongo_uri)
+    from flask_jwt_extended import create_access_token
+
+    db = app.mongo.db
+    db.users.delete_many({})
+    password = generate_password_hash(PASSWORD, args.method)
+    emails = [f"user{i}@bench.local" for i in range(args.users)]
+    db.users.insert_many([{"email": email, "password": password, "created_at": datetime.utcnow()}
+                          for email in emails])
+    with app.app.app_context():
+        token = create_access_token(identity=emails[0])
+
+    report = {
+        "users": args.users,
+        "burst": args.burst,
+        "concurrency": args.concurrency,
+        "background_clients": args.background,
+        "workers": args.workers,
+        "queue_size": args.queue_size,
+        "method": args.method,
+        "cpus": os.cpu_count(),
+    }
+    for mode in args.modes.split(","):
+        report[mode] = run_mode(app, args, emails, token, mode)
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
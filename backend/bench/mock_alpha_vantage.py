@@ -0,0 +1,164 @@
+"""Mock Alpha Vantage API for load tests.
+
+Serves GLOBAL_QUOTE, SYMBOL_SEARCH and LISTING_STATUS with the real response
+shapes, an injected latency, and the free tier's rate limiting: calls over
+``rate_per_minute`` get the 200 + "Note" payload Alpha Vantage sends instead
+of a quote. Prices are a deterministic random walk per symbol.
+
+    python bench/mock_alpha_vantage.py --port 8099 --latency 0.2 --rate-per-minute 75
+    ALPHA_VANTAGE_URL=http://127.0.0.1:8099/query python app.py
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import zlib
+from collections import Counter, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+RATE_LIMIT_NOTE = ("Thank you for using Alpha Vantage! Our standard API call frequency is "
+                   "5 calls per minute and 500 calls per day.")
+
+
+def base_price(symbol):
+    """Stable starting price for ``symbol`` between 10 and 1000"""
+    return 10 + zlib.crc32(symbol.upper().encode()) % 99000 / 100
+
+
+class MockAlphaVantage:
+    """Threaded HTTP server with per-function call counters"""
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, jitter=0.0,
+                 rate_per_minute=0, volatility=0.002, seed=42):
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_per_minute = rate_per_minute
+        self.volatility = volatility
+        self.calls = Counter()       # function -> calls answered
+        self.rate_limited = 0
+        self._random = random.Random(seed)
+        self._prices = {}
+        self._volumes = {}
+        self._window = deque()       # monotonic times of calls in the last minute
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/query"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, name="mock-alpha-vantage", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def total_calls(self):
+        with self._lock:
+            return sum(self.calls.values())
+
+    def stats(self):
+        with self._lock:
+            return {"calls": dict(self.calls), "rate_limited": self.rate_limited}
+
+    def answer(self, params):
+        """Response body for one query string, as a dict or CSV text"""
+        if not self._admit():
+            return {"Note": RATE_LIMIT_NOTE}
+        function = params.get("function", "")
+        with self._lock:
+            self.calls[function] += 1
+        if function == "GLOBAL_QUOTE":
+            return self._quote(params.get("symbol", "").upper())
+        if function == "SYMBOL_SEARCH":
+            keywords = params.get("keywords", "").upper()
+            return {"bestMatches": [{
+                "1. symbol": f"{keywords}{suffix}", "2. name": f"{keywords} Corp {suffix}",
+                "3. type": "Equity", "4. region": "United States", "5. marketOpen": "09:30",
+                "6. marketClose": "16:00", "7. timezone": "UTC-04", "8. currency": "USD",
+                "9. matchScore": "1.0000",
+            } for suffix in ("", "A", "B")]}
+        if function == "LISTING_STATUS":
+            return ("symbol,name,exchange,assetType,ipoDate,delistingDate,status\n"
+                    "MOCK,Mock Corp,NYSE,Stock,2000-01-01,null,Active\n")
+        return {"Error Message": f"Invalid API call: {function}"}
+
+    def _admit(self):
+        if not self.rate_per_minute:
+            return True
+        now = time.monotonic()
+        with self._lock:
+            while self._window and now - self._window[0] >= 60:
+                self._window.popleft()
+            if len(self._window) >= self.rate_per_minute:
+                self.rate_limited += 1
+                return False
+            self._window.append(now)
+            return True
+
+    def _quote(self, symbol):
+        with self._lock:
+            price = self._prices.get(symbol) or base_price(symbol)
+            price = round(price * (1 + self._random.gauss(0, self.volatility)), 4)
+            volume = self._volumes.get(symbol, 0) + self._random.randint(100, 10000)
+            self._prices[symbol], self._volumes[symbol] = price, volume
+        return {"Global Quote": {
+            "01. symbol": symbol,
+            "05. price": f"{price:.4f}",
+            "06. volume": str(volume),
+            "07. latest trading day": time.strftime("%Y-%m-%d"),
+        }}
+
+    def _handler(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                params = {key: values[0] for key, values in parse_qs(urlparse(self.path).query).items()}
+                delay = mock.latency + mock._random.uniform(0, mock.jitter) if mock.jitter else mock.latency
+                if delay:
+                    time.sleep(delay)
+                body = mock.answer(params)
+                if isinstance(body, str):
+                    payload, content_type = body.encode(), "text/csv"
+                else:
+                    payload, content_type = json.dumps(body).encode(), "application/json"
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="extra random latency, up to this many seconds")
+    parser.add_argument("--rate-per-minute", type=int, default=0, help="0 disables rate limiting")
+    args = parser.parse_args()
+
+    mock = MockAlphaVantage(args.host, args.port, args.latency, args.jitter, args.rate_per_minute)
+    print(f"Mock Alpha Vantage on {mock.url}")
+    try:
+        mock.server.serve_forever()
+    except KeyboardInterrupt:
+        print(json.dumps(mock.stats(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,347 @@
+"""Load test: alert cycles, upstream usage, Socket.IO fan-out and REST throughput.
+
+Starts the mock Alpha Vantage server and the SMTP sink, points the app at
+them through its environment variables, seeds N users with M alerts, and
+connects K Socket.IO test clients. The database is mongomock unless
+--mongo-uri names a real server (its alerts, watchlists, users and history
+are wiped first). Results are printed as JSON and written to --output so
+runs can be compared across commits.
+
+    python bench/run_benchmarks.py --users 200 --alerts 5000 --subscribers 1000
+    python bench/run_benchmarks.py --av-latency 0.3 --av-rate 75 --governor-rate 75
+
+Memory per connection is traced Python allocations while the clients connect
+and subscribe, so it includes the test clients' own bookkeeping and is an
+upper bound on what the server keeps per socket.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from types import SimpleNamespace
+
+import numpy as np
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+
+from bench.mock_alpha_vantage import MockAlphaVantage, base_price
+from bench.smtp_sink import SmtpSink
+
+
+def percentiles(samples, scale=1000.0):
+    """p50/p95/p99/max of ``samples`` (seconds), reported in milliseconds"""
+    if not len(samples):
+        return {}
+    p50, p95, p99 = np.percentile(samples, [50, 95, 99]) * scale
+    return {"p50_ms": round(p50, 3), "p95_ms": round(p95, 3), "p99_ms": round(p99, 3),
+            "max_ms": round(max(samples) * scale, 3)}
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def configure_env(args, mock, sink):
+    """Point the app's settings at the mock services before it is imported"""
+    host, port = sink.address
+    os.environ.update({
+        "MONGO_URI": args.mongo_uri or "mongodb://localhost:27017/bench",
+        "JWT_SECRET_KEY": "bench",
+        "SECRET_KEY": "bench",
+        "ALPHA_VANTAGE_URL": mock.url,
+        "ALPHA_VANTAGE_KEY": "bench",
+        "ALPHA_VANTAGE_RATE_PER_MINUTE": str(args.governor_rate),
+        "ALPHA_VANTAGE_BURST": str(args.governor_rate),
+        "SMTP_HOST": host,
+        "SMTP_PORT": str(port),
+        "SMTP_STARTTLS": "false",
+        "EMAIL_USER": "alerts@bench.local",
+        "EMAIL_PASS": "",
+        "EMAIL_DIGEST_WINDOW": "0",
+        "SOCKETIO_ASYNC_MODE": "threading",
+        "SOCKETIO_MESSAGE_QUEUE": "",
+        "TICK_FLUSH_INTERVAL": "0",
+        # The fan-out phase flushes by hand; keep the broadcast task out of the way
+        "BROADCAST_INTERVAL": "3600",
+        "LOG_LEVEL": "WARNING",
+    })
+
+
+def import_app(mongo_uri):
+    """Build the web app against mongomock, or against ``mongo_uri`` when given.
+
+    Returns the pieces the benchmarks drive: the Flask ``app``, ``mongo``,
+    ``socketio``, ``alert_index``, ``price_hub`` and the ``api`` module.
+    """
+    import api
+    import sockets
+    from app import create_app
+    from migrate import migrate
+    from services.alert_index import alert_index
+    from utils.extensions import mongo, socketio
+
+    # No background services: the benchmarks load and drive alert_index themselves
+    if mongo_uri:
+        flask_app = create_app()
+    else:
+        import flask_pymongo
+        import mongomock
+        from unittest import mock
+
+        client = mongomock.MongoClient()
+        # mongomock has no time-series collections; give the app a plain one
+        client.bench.create_collection("ticks")
+        with mock.patch.object(flask_pymongo, "MongoClient", lambda *args, **kwargs: client):
+            flask_app = create_app()
+    migrate(mongo.db)
+    return SimpleNamespace(app=flask_app, mongo=mongo, socketio=socketio, alert_index=alert_index,
+                           price_hub=sockets.price_hub, api=api)
+
+
+def seed(db, args, symbols, rng):
+    """Insert users, watchlists and alerts; about ``fire_ratio`` of the alerts fire"""
+    for name in ("users", "watchlists", "alerts", "alert_history"):
+        db[name].delete_many({})
+    emails = [f"user{i}@bench.local" for i in range(args.users)]
+    now = datetime.utcnow()
+    db.users.insert_many([{"email": email, "password": "bench", "created_at": now} for email in emails])
+    db.watchlists.insert_many([{"email": email, "stocks": rng.sample(symbols, min(8, len(symbols)))}
+                               for email in emails])
+    alerts = []
+    for i in range(args.alerts):
+        symbol = rng.choice(symbols)
+        condition = rng.choice(("above", "below"))
+        fires = rng.random() < args.fire_ratio
+        # Far enough from the mock's random walk that only the chosen ones fire
+        low, high = base_price(symbol) * 0.5, base_price(symbol) * 2
+        target = (low if fires else high) if condition == "above" else (high if fires else low)
+        alerts.append({"email": emails[i % len(emails)], "symbol": symbol, "condition": condition,
+                       "target_price": round(target, 2), "triggered": False,
+                       "created_at": now, "updated_at": now})
+    if alerts:
+        db.alerts.insert_many(alerts)
+    return emails
+
+
+def bench_alert_cycles(app, args, mock, sink):
+    from services.alert_service import AlertChecker
+    from services.notification_service import email_notifier
+    from services.quote_service import quote_cache
+
+    app.alert_index.load(app.mongo.db.alerts.find({"triggered": False}))
+    checker = AlertChecker(app.mongo.db, app.alert_index, notifier=email_notifier)
+    cycles, fired = [], 0
+    for _ in range(args.cycles):
+        # Every cycle is cold, as with the default 60 s check interval and 30 s quote TTL
+        quote_cache.clear()
+        calls = mock.total_calls()
+        start = time.perf_counter()
+        fired_now = len(checker.run_cycle())
+        cycles.append({"seconds": round(time.perf_counter() - start, 4),
+                       "upstream_calls": mock.total_calls() - calls,
+                       "fired": fired_now})
+        fired += fired_now
+
+    drain_start = time.perf_counter()
+    email_notifier.join()
+    delivered = sink.wait_for(fired, timeout=args.email_timeout)
+    return {
+        "active_alerts_before": args.alerts,
+        "cycles": cycles,
+        "latency": percentiles([cycle["seconds"] for cycle in cycles]),
+        "fired": fired,
+        "email": {
+            "delivered": sink.messages,
+            "all_delivered": delivered,
+            "drain_seconds": round(time.perf_counter() - drain_start, 4),
+            "notifier": email_notifier.stats(),
+        },
+    }
+
+
+def bench_fanout(app, args, symbols, rng):
+    hub = app.price_hub
+    # Test clients do not ack, so turn off backpressure to measure every send
+    hub.ack_timeout = 0
+    marks = []
+    socketio = hub.socketio
+
+    class TimedSocketIO:
+        def emit(self, *emit_args, **kwargs):
+            socketio.emit(*emit_args, **kwargs)
+            marks.append(time.perf_counter())
+
+        def __getattr__(self, name):
+            return getattr(socketio, name)
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    clients = []
+    for _ in range(args.subscribers):
+        client = app.socketio.test_client(app.app)
+        client.emit("subscribe_stocks", {"symbols": rng.sample(symbols, min(args.symbols_per_client, len(symbols)))})
+        client.get_received()
+        clients.append(client)
+    connect_seconds = time.perf_counter() - start
+    per_connection = (tracemalloc.get_traced_memory()[0] - before) / max(args.subscribers, 1)
+    tracemalloc.stop()
+
+    hub.socketio = TimedSocketIO()
+    latencies, flushes, frames = [], [], 0
+    watched = [symbol for symbol in symbols if hub.subscriber_count(symbol)]
+    try:
+        for round_no in range(args.rounds):
+            for symbol in watched:
+                hub.observe(symbol, base_price(symbol) * (1 + 0.01 * (round_no + 1)))
+            marks.clear()
+            start = time.perf_counter()
+            hub.flush()
+            flushes.append(time.perf_counter() - start)
+            latencies.extend(mark - start for mark in marks)
+            frames += sum(len(client.get_received()) for client in clients)
+    finally:
+        hub.socketio = socketio
+        for client in clients:
+            client.disconnect()
+
+    return {
+        "subscribers": args.subscribers,
+        "symbols_per_client": args.symbols_per_client,
+        "watched_symbols": len(watched),
+        "connect_subscribe_seconds": round(connect_seconds, 4),
+        "memory_per_connection_bytes": round(per_connection),
+        "rounds": args.rounds,
+        "frames_received": frames,
+        "emit_latency": percentiles(latencies),
+        "flush": percentiles(flushes),
+    }
+
+
+def bench_rest(app, args, emails, symbols, rng):
+    from flask_jwt_extended import create_access_token
+
+    with app.app.app_context():
+        tokens = [create_access_token(identity=email) for email in emails[:args.rest_users]]
+    local = threading.local()
+
+    def call(method, path, body):
+        client = getattr(local, "client", None)
+        if client is None:
+            client = local.client = app.app.test_client()
+        headers = {"Authorization": f"Bearer {random.choice(tokens)}"}
+        start = time.perf_counter()
+        response = client.open(path, method=method, json=body, headers=headers)
+        elapsed = time.perf_counter() - start
+        return elapsed, response.status_code < 400
+
+    scenarios = {
+        "GET /api/alerts": ("GET", "/api/alerts", lambda: None),
+        "POST /api/alerts": ("POST", "/api/alerts",
+                             lambda: {"symbol": rng.choice(symbols), "condition": "above", "target_price": 1e9}),
+        "GET /api/watchlist": ("GET", "/api/watchlist", lambda: None),
+        "POST /api/watchlist": ("POST", "/api/watchlist", lambda: {"symbol": rng.choice(symbols)}),
+    }
+    results = {}
+    with ThreadPoolExecutor(args.rest_concurrency) as pool:
+        for name, (method, path, body) in scenarios.items():
+            bodies = [body() for _ in range(args.requests)]
+            start = time.perf_counter()
+            outcomes = list(pool.map(lambda payload: call(method, path, payload), bodies))
+            wall = time.perf_counter() - start
+            results[name] = {
+                "requests": args.requests,
+                "errors": sum(1 for _, ok in outcomes if not ok),
+                "requests_per_second": round(args.requests / wall, 1),
+                "latency": percentiles([elapsed for elapsed, _ in outcomes]),
+            }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--alerts", type=int, default=5000)
+    parser.add_argument("--symbols", type=int, default=200, help="distinct symbols in the scenario")
+    parser.add_argument("--fire-ratio", type=float, default=0.02, help="share of alerts that trigger")
+    parser.add_argument("--cycles", type=int, default=3, help="alert check cycles to time")
+    parser.add_argument("--subscribers", type=int, default=500, help="Socket.IO clients")
+    parser.add_argument("--symbols-per-client", type=int, default=10)
+    parser.add_argument("--rounds", type=int, default=10, help="broadcast rounds to time")
+    parser.add_argument("--requests", type=int, default=1000, help="requests per REST endpoint")
+    parser.add_argument("--rest-users", type=int, default=50, help="users the REST requests are spread over")
+    parser.add_argument("--rest-concurrency", type=int, default=4)
+    parser.add_argument("--av-latency", type=float, default=0.05, help="mock Alpha Vantage latency, seconds")
+    parser.add_argument("--av-jitter", type=float, default=0.0)
+    parser.add_argument("--av-rate", type=int, default=0, help="mock rate limit per minute, 0 for none")
+    parser.add_argument("--governor-rate", type=float, default=1000000, help="ALPHA_VANTAGE_RATE_PER_MINUTE")
+    parser.add_argument("--check-interval", type=float, default=60, help="alert check interval for projections")
+    parser.add_argument("--poll-interval", type=float, default=10, help="hub poll interval for projections")
+    parser.add_argument("--email-timeout", type=float, default=60)
+    parser.add_argument("--mongo-uri", help="use this MongoDB instead of mongomock (data is wiped)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="bench-results.json")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    mock = MockAlphaVantage(latency=args.av_latency, jitter=args.av_jitter,
+                            rate_per_minute=args.av_rate, seed=args.seed).start()
+    sink = SmtpSink().start()
+    configure_env(args, mock, sink)
+    symbols = [f"SYM{i:04d}" for i in range(args.symbols)]
+
+    # The app and services print per event; keep the report readable
+    with contextlib.redirect_stdout(io.StringIO()):
+        app = import_app(args.mongo_uri)
+        emails = seed(app.mongo.db, args, symbols, rng)
+        started = time.perf_counter()
+        alert_cycles = bench_alert_cycles(app, args, mock, sink)
+        alert_calls = sum(cycle["upstream_calls"] for cycle in alert_cycles["cycles"])
+        fanout = bench_fanout(app, args, symbols, rng)
+        rest = bench_rest(app, args, emails, symbols, rng)
+        elapsed = time.perf_counter() - started
+
+    calls_per_cycle = alert_calls / max(args.cycles, 1)
+    report = {
+        "commit": git_commit(),
+        "timestamp": datetime.utcnow().isoformat() + "Z",
+        "scenario": {key: value for key, value in vars(args).items() if key != "output"},
+        "alert_cycle": alert_cycles,
+        "upstream": {
+            **mock.stats(),
+            "calls_per_minute_measured": round(mock.total_calls() / elapsed * 60, 1),
+            "alert_calls_per_cycle": calls_per_cycle,
+            # What a steady-state deployment would spend: checker cycles plus one poller per watched symbol
+            "calls_per_minute_projected": round(
+                calls_per_cycle * 60 / args.check_interval
+                + fanout["watched_symbols"] * 60 / args.poll_interval, 1),
+        },
+        "fanout": fanout,
+        "rest": rest,
+    }
+    mock.stop()
+    sink.stop()
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""SMTP sink for load tests: accepts every message and counts it.
+
+    python bench/smtp_sink.py --port 8025
+    SMTP_HOST=127.0.0.1 SMTP_PORT=8025 SMTP_STARTTLS=false python app.py
+"""
+import argparse
+import socket
+import threading
+import time
+
+from aiosmtpd.controller import Controller
+
+
+class SmtpSink:
+    """aiosmtpd controller that keeps delivery counts instead of messages"""
+
+    def __init__(self, host="127.0.0.1", port=0):
+        if not port:
+            # aiosmtpd needs a concrete port; borrow a free one from the OS
+            with socket.socket() as probe:
+                probe.bind((host, 0))
+                port = probe.getsockname()[1]
+        self.messages = 0
+        self.recipients = 0
+        self.bytes = 0
+        self.last_received = None
+        self._lock = threading.Lock()
+        self.controller = Controller(self, hostname=host, port=port)
+
+    @property
+    def address(self):
+        return self.controller.hostname, self.controller.port
+
+    def start(self):
+        self.controller.start()
+        return self
+
+    def stop(self):
+        self.controller.stop()
+
+    def wait_for(self, count, timeout=30):
+        """Block until ``count`` messages arrived; returns whether they did"""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.messages >= count:
+                return True
+            time.sleep(0.01)
+        return self.messages >= count
+
+    def stats(self):
+        return {"messages": self.messages, "recipients": self.recipients, "bytes": self.bytes}
+
+    async def handle_DATA(self, server, session, envelope):
+        with self._lock:
+            self.messages += 1
+            self.recipients += len(envelope.rcpt_tos)
+            self.bytes += len(envelope.content)
+            self.last_received = time.monotonic()
+        return "250 OK"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8025)
+    args = parser.parse_args()
+
+    sink = SmtpSink(args.host, args.port).start()
+    print(f"SMTP sink on {args.host}:{args.port}")
+    try:
+        while True:
+            time.sleep(5)
+            print(sink.stats())
+    except KeyboardInterrupt:
+        sink.stop()
+
+
+if __name__ == "__main__":
+    main()
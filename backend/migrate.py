@@ -0,0 +1,48 @@
+"""Create the MongoDB indexes and collections the app expects.
+
+Run once per deployment, and again after upgrades; every step is idempotent:
+
+    python migrate.py
+
+The web and worker processes no longer touch the schema at startup.
+"""
+import logging
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from pymongo import MongoClient
+from utils.log import configure_logging
+
+logger = logging.getLogger(__name__)
+
+
+def migrate(db):
+    """Create every index and the ticks time-series collection on ``db``"""
+    db.users.create_index("email", unique=True)
+    db.watchlists.create_index("email", unique=True)
+    db.alerts.create_index([("email", 1), ("symbol", 1)])
+    db.alerts.create_index([("email", 1), ("_id", 1)])
+    db.alerts.create_index([("triggered", 1)], partialFilterExpression={"triggered": False})
+    db.alerts.create_index("updated_at")
+    db.alert_workers.create_index("expires_at", expireAfterSeconds=3600)
+    db.quote_clients.create_index("expires_at", expireAfterSeconds=3600)
+    if "ticks" not in db.list_collection_names():
+        db.create_collection(
+            "ticks",
+            timeseries={"timeField": "ts", "metaField": "symbol", "granularity": "seconds"},
+            expireAfterSeconds=int(float(os.getenv("TICK_RETENTION_DAYS", 30)) * 86400)
+        )
+    # _id breaks ties between firings of one cycle, which share triggered_at
+    db.alert_history.create_index([("email", 1), ("triggered_at", -1), ("_id", -1)])
+
+
+def main():
+    configure_logging()
+    db = MongoClient(os.getenv("MONGO_URI")).get_default_database()
+    migrate(db)
+    logger.info("Indexes and collections are up to date on %s", db.name)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+"""Production entry point: Socket.IO on an event loop instead of OS threads.
+
+    python serve.py
+
+or, under gunicorn (one worker per process; scale out with more processes
+behind a sticky load balancer and SOCKETIO_MESSAGE_QUEUE set):
+
+    gunicorn -k geventwebsocket.gunicorn.workers.GeventWebSocketWorker -w 1 serve:app
+
+SOCKETIO_ASYNC_MODE picks gevent (default) or eventlet. The process is
+monkey-patched before anything else is imported, so requests, smtplib,
+pymongo, time.sleep and the service threads all become cooperative.
+Alert checking is not run here; start `python worker.py` processes for it,
+and create indexes with `python migrate.py` before the first start.
+"""
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+ASYNC_MODE = os.environ.setdefault("SOCKETIO_ASYNC_MODE", "gevent")
+
+if ASYNC_MODE == "gevent":
+    from gevent import monkey
+    monkey.patch_all()
+elif ASYNC_MODE == "eventlet":
+    import eventlet
+    eventlet.monkey_patch()
+else:
+    raise SystemExit(f"serve.py needs SOCKETIO_ASYNC_MODE=gevent or eventlet, not {ASYNC_MODE!r}")
+
+from app import SERVICES, create_app  # noqa: E402  (must follow monkey patching)
+from utils.extensions import socketio  # noqa: E402
+
+app = create_app(SERVICES)
+
+if __name__ == "__main__":
+    socketio.run(app, host=os.getenv("HOST", "0.0.0.0"), port=int(os.getenv("PORT", 5000)))
@@ -0,0 +1,172 @@
+import math
+import threading
+from bisect import bisect_left, bisect_right, insort
+from services.condition_engine import ConditionEngine
+
+
+class AlertIndex:
+    """In-memory index of untriggered alerts, kept as sorted thresholds per symbol.
+
+    "above" alerts fire when price >= target, so every crossed alert sits at the
+    start of the ascending ``above`` list. "below" alerts fire when
+    price <= target, so every crossed alert sits at the end of the ascending
+    ``below`` list. Either way a price update is one bisect plus one slice.
+    Window-based conditions (percent change, crossovers, ...) are kept in
+    ``conditions`` and evaluated against tick history by ``evaluate_window``.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._above = {}   # symbol -> sorted [(target_price, alert_id)]
+        self._below = {}   # symbol -> sorted [(target_price, alert_id)]
+        self._alerts = {}  # alert_id -> alert fields needed to fire it
+        self.conditions = ConditionEngine()
+
+    def __len__(self):
+        return len(self._alerts) + len(self.conditions)
+
+    def load(self, alerts):
+        """Rebuild the index from an iterable of alert documents"""
+        alerts = list(alerts)
+        self.conditions.load(alerts)
+        above, below, entries = {}, {}, {}
+        for alert in alerts:
+            entry = self._entry(alert)
+            if entry is None:
+                continue
+            entries[entry["_id"]] = entry
+            side = above if entry["condition"] == "above" else below
+            side.setdefault(entry["symbol"], []).append((entry["target_price"], entry["_id"]))
+        for side in (above, below):
+            for thresholds in side.values():
+                thresholds.sort()
+        with self._lock:
+            self._above, self._below, self._alerts = above, below, entries
+
+    def add(self, alert):
+        """Index a single alert document, dropping it if it is no longer untriggered"""
+        self.conditions.add(alert)
+        entry = self._entry(alert)
+        with self._lock:
+            self._remove(str(alert["_id"]))
+            if entry is None:
+                return
+            self._alerts[entry["_id"]] = entry
+            insort(self._side(entry["condition"]).setdefault(entry["symbol"], []),
+                   (entry["target_price"], entry["_id"]))
+
+    def add_many(self, alerts):
+        """Index many alert documents under one lock, re-sorting each touched symbol once"""
+        alerts = list(alerts)
+        self.conditions.add_many(alerts)
+        entries = [entry for entry in map(self._entry, alerts) if entry is not None]
+        with self._lock:
+            for alert in alerts:
+                self._remove(str(alert["_id"]))
+            touched = set()
+            for entry in entries:
+                self._alerts[entry["_id"]] = entry
+                self._side(entry["condition"]).setdefault(entry["symbol"], []).append(
+                    (entry["target_price"], entry["_id"]))
+                touched.add((entry["condition"], entry["symbol"]))
+            for condition, symbol in touched:
+                self._side(condition)[symbol].sort()
+
+    def remove(self, alert_id):
+        """Drop an alert from the index; unknown ids are ignored"""
+        removed = self.conditions.remove(alert_id)
+        with self._lock:
+            return self._remove(str(alert_id)) is not None or removed
+
+    def ids(self):
+        """Ids of every indexed alert"""
+        with self._lock:
+            return set(self._alerts) | self.conditions.ids()
+
+    def symbols(self):
+        """Symbols with at least one untriggered alert"""
+        with self._lock:
+            return set(self._above) | set(self._below) | self.conditions.symbols()
+
+    def count(self, symbols):
+        """Untriggered alerts on ``symbols``"""
+        with self._lock:
+            thresholds = sum(len(self._above.get(symbol, ())) + len(self._below.get(symbol, ()))
+                             for symbol in symbols)
+        return thresholds + self.conditions.count(symbols)
+
+    def distance(self, symbol, price):
+        """Relative gap from ``price`` to the nearest threshold on ``symbol``, or None"""
+        with self._lock:
+            above = self._above.get(symbol)
+            below = self._below.get(symbol)
+            # Crossed alerts are popped, so pending ones are above or below the last price
+            gaps = []
+            if above:
+                gaps.append(above[0][0] - price)
+            if below:
+                gaps.append(price - below[-1][0])
+        if not gaps or not price:
+            return None
+        return max(min(gaps), 0.0) / price
+
+    def evaluate(self, symbol, price):
+        """Pop and return every alert on ``symbol`` crossed by ``price``"""
+        fired = []
+        with self._lock:
+            above = self._above.get(symbol)
+            if above:
+                cut = bisect_right(above, (price, chr(0x10FFFF)))
+                fired.extend(above[:cut])
+                del above[:cut]
+                if not above:
+                    del self._above[symbol]
+            below = self._below.get(symbol)
+            if below:
+                cut = bisect_left(below, (price, ""))
+                fired.extend(below[cut:])
+                del below[cut:]
+                if not below:
+                    del self._below[symbol]
+            return [self._alerts.pop(alert_id) for _, alert_id in fired]
+
+    def evaluate_window(self, symbol, timestamps, prices, volumes=None):
+        """Pop and return every window-based alert on ``symbol`` that holds on these ticks"""
+        return self.conditions.evaluate(symbol, timestamps, prices, volumes)
+
+    def _side(self, condition):
+        return self._above if condition == "above" else self._below
+
+    def _remove(self, alert_id):
+        entry = self._alerts.pop(alert_id, None)
+        if entry is None:
+            return None
+        side = self._side(entry["condition"])
+        thresholds = side.get(entry["symbol"], [])
+        key = (entry["target_price"], alert_id)
+        pos = bisect_left(thresholds, key)
+        if pos < len(thresholds) and thresholds[pos] == key:
+            del thresholds[pos]
+        if not thresholds:
+            side.pop(entry["symbol"], None)
+        return entry
+
+    @staticmethod
+    def _entry(alert):
+        if alert.get("triggered") or alert.get("condition") not in ("above", "below"):
+            return None
+        target_price = float(alert["target_price"])
+        if not math.isfinite(target_price):
+            # Stored before targets were validated; it would break the bisect order
+            return None
+        return {
+            "_id": str(alert["_id"]),
+            "email": alert["email"],
+            "symbol": alert["symbol"],
+            "target_price": target_price,
+            "condition": alert["condition"],
+        }
+
+
+# The web process's index of untriggered alerts; worker processes build their own
+alert_index = AlertIndex()
@@ -1,47 +1,211 @@
-from datetime import datetime
+import logging
 import threading
-from flask_pymongo import PyMongo
-import requests
-import os
-from utils.helpers import send_alert_email
-from flask_socketio import SocketIO
-
-mongo = PyMongo()
-socketio = SocketIO()
-
-def get_current_price(symbol):
-    """Fetch current stock price from Alpha Vantage"""
-    url = f"https://www.alphavantage.co/query?function=GLOBAL_QUOTE&symbol={symbol}&apikey={os.getenv('ALPHA_VANTAGE_KEY')}"
-    response = requests.get(url, timeout=5)
-    if response.status_code == 200:
-        return response.json().get("Global Quote", {}).get("05. price")
-    return None
-
-def check_alerts():
-    while True:
+import time
+from datetime import datetime
+from bson.objectid import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, PyMongoError
+from services.notification_service import email_notifier
+from services.quote_service import get_prices, tick_store
+from services.rate_governor import PRIORITY_ALERT
+from utils.metrics import ALERT_CYCLE_ERRORS, ALERT_CYCLE_SECONDS, ALERTS_EVALUATED, ALERTS_FIRED
+
+logger = logging.getLogger(__name__)
+
+
+class AlertChecker:
+    """Evaluates the alert index against fresh prices once per interval.
+
+    With a ``leases`` manager only the symbols in the shards this process
+    currently holds are evaluated, so several checker processes can split
+    the symbol space between them. With a ``scheduler`` each symbol is
+    checked when its own adaptive deadline comes due instead of all of them
+    every ``interval``.
+    """
+
+    def __init__(self, db, index, notifier=email_notifier, leases=None, interval=60, scheduler=None):
+        self.db = db
+        self.index = index
+        self.notifier = notifier
+        self.leases = leases
+        self.interval = interval
+        self.scheduler = scheduler
+        self._thread = None
+
+    def start(self):
+        """Run the checker on a daemon thread"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self.run_forever, name="alert-checker", daemon=True)
+            self._thread.start()
+
+    def run_forever(self):
+        if self.scheduler is not None:
+            return self._run_scheduled()
+        while True:
+            cycle_start = time.monotonic()
+            self.run_cycle()
+            # Sleep out the remainder of the interval so cycles start on a fixed cadence
+            time.sleep(max(0, self.interval - (time.monotonic() - cycle_start)))
+
+    def _run_scheduled(self):
+        while True:
+            # Follow alerts being added, removed and fired, and shards moving between workers
+            self.scheduler.sync(self._owned_symbols())
+            due = self.scheduler.due()
+            if due:
+                self.run_cycle(due)
+            # Wake at least once a second so new symbols start being polled promptly
+            wait = self.scheduler.wait_time()
+            time.sleep(1.0 if wait is None else min(wait, 1.0))
+
+    def _owned_symbols(self):
+        symbols = self.index.symbols()
+        if self.leases is not None:
+            symbols = {symbol for symbol in symbols if self.leases.owns(symbol)}
+        return symbols
+
+    def run_cycle(self, symbols=None):
+        """Evaluate ``symbols`` (every owned symbol by default) once; returns the firings committed"""
+        cycle_start = time.monotonic()
+        prices = {}
         try:
-            active_alerts = list(mongo.db.alerts.find({"triggered": False}))
-            for alert in active_alerts:
-                symbol = alert["symbol"]
-                price = get_current_price(symbol)
-                
-                if price:
-                    current_price = float(price)
-                    target_price = float(alert["target_price"])
-                    condition = alert["condition"]
-                    
-                    if (condition == "above" and current_price >= target_price) or \
-                       (condition == "below" and current_price <= target_price):
-                        send_alert_email(alert["email"], symbol, current_price)
-                        mongo.db.alerts.update_one(
-                            {"_id": alert["_id"]},
-                            {"$set": {"triggered": True, "triggered_at": datetime.utcnow()}}
-                        )
+            active = len(self.index)
+            if symbols is None:
+                symbols = self._owned_symbols()
+            # One concurrent upstream call per distinct symbol, shared by every alert on it
+            prices = get_prices(symbols, PRIORITY_ALERT)
+            evaluated = self.index.count(prices)
+            firings = [
+                (alert, current_price)
+                for symbol, current_price in prices.items()
+                for alert in self.index.evaluate(symbol, current_price)
+            ]
+            # Window-based conditions: one vectorised pass per symbol over its ticks
+            for symbol in prices.keys() & self.index.conditions.symbols():
+                timestamps, history, volumes = tick_store.latest(symbol, tick_store.capacity)
+                firings.extend(
+                    (alert, prices[symbol])
+                    for alert in self.index.evaluate_window(symbol, timestamps, history, volumes)
+                )
+            fired = self.record_firings(firings)
+            for alert, current_price in fired:
+                # Queue email; delivery happens on the notifier's worker pool
+                self.notifier.notify(
+                    alert["email"],
+                    alert["symbol"],
+                    current_price,
+                    alert["condition"],
+                    target_price=alert.get("target_price"),
+                    params=alert.get("params")
+                )
+            elapsed = time.monotonic() - cycle_start
+            ALERT_CYCLE_SECONDS.observe(elapsed)
+            ALERTS_EVALUATED.inc(evaluated)
+            ALERTS_FIRED.inc(len(fired))
+            logger.info("Alert cycle: %d active alerts, %d symbols, %d fired in %.2fs",
+                        active, len(prices), len(fired), elapsed,
+                        extra={"alerts": active, "symbols": len(prices), "fired": len(fired),
+                               "seconds": round(elapsed, 4)})
+            return fired
         except Exception as e:
-            print(f"Alert check error: {e}")
-        socketio.sleep(60)
+            ALERT_CYCLE_ERRORS.inc()
+            logger.exception("Alert check error: %s", e)
+            return []
+        finally:
+            if self.scheduler is not None:
+                # Symbols the governor refused keep their last price and retry after an interval
+                for symbol in symbols or ():
+                    self.scheduler.reschedule(symbol, prices.get(symbol))
+
+    def record_firings(self, firings):
+        """Persist a cycle's (alert, price) firings in a constant number of round-trips.
+
+        The update only matches alerts that are still untriggered, so a concurrent
+        checker cannot fire the same alert twice. Returns the firings this checker
+        won; only those are written to history and emailed. Alerts whose flip did
+        not commit go back into the index for the next cycle.
+        """
+        if not firings:
+            return []
+        triggered_at = datetime.utcnow()
+        cycle_token = ObjectId()
+        try:
+            result = self.db.alerts.bulk_write([
+                UpdateOne(
+                    {"_id": ObjectId(alert["_id"]), "triggered": False},
+                    {"$set": {"triggered": True, "triggered_at": triggered_at,
+                              "updated_at": triggered_at, "fired_by": cycle_token}}
+                ) for alert, _ in firings
+            ], ordered=False)
+            complete = result.modified_count == len(firings)
+        except PyMongoError as e:
+            # Some of the unordered updates may have committed before the error
+            logger.warning("Alert trigger write failed: %s", e)
+            complete = False
+        if not complete:
+            # Someone else got to some of them first, or the write failed part way;
+            # the firings carrying this cycle's token are ours
+            try:
+                won = {str(doc["_id"]) for doc in self.db.alerts.find(
+                    {"_id": {"$in": [ObjectId(alert["_id"]) for alert, _ in firings]}, "fired_by": cycle_token},
+                    {"_id": 1}
+                )}
+            except PyMongoError:
+                # Cannot tell which flips committed; retry them all next cycle
+                for alert, _ in firings:
+                    self.index.add(alert)
+                raise
+            lost = [alert for alert, _ in firings if alert["_id"] not in won]
+            firings = [(alert, price) for alert, price in firings if alert["_id"] in won]
+            # Still untriggered ones go back; ones triggered elsewhere are dropped by the sync
+            self._restore_untriggered(lost)
+        if firings:
+            self._record_history([{
+                "_id": ObjectId(),
+                "email": alert["email"],
+                "symbol": alert["symbol"],
+                "target_price": alert["target_price"],
+                "actual_price": price,
+                "condition": alert["condition"],
+                "params": alert.get("params"),
+                "triggered_at": triggered_at
+            } for alert, price in firings])
+        return firings
+
+    def _restore_untriggered(self, alerts):
+        if not alerts:
+            return
+        try:
+            pending = {str(doc["_id"]) for doc in self.db.alerts.find(
+                {"_id": {"$in": [ObjectId(alert["_id"]) for alert in alerts]}, "triggered": False},
+                {"_id": 1}
+            )}
+        except PyMongoError as e:
+            logger.warning("Could not re-read unfired alerts, putting them all back: %s", e)
+            pending = {alert["_id"] for alert in alerts}
+        for alert in alerts:
+            if alert["_id"] in pending:
+                self.index.add(alert)
+
+    def _record_history(self, documents, attempts=3):
+        """Insert history rows for committed firings, retrying on transient errors.
 
-def start_alert_checker():
-    thread = threading.Thread(target=check_alerts)
-    thread.daemon = True
-    thread.start()
\ No newline at end of file
+        The alerts are already triggered, so a failure here must not stop the
+        emails; rows carry their own ``_id`` so a retry after a partial insert
+        only skips the duplicates.
+        """
+        for attempt in range(1, attempts + 1):
+            try:
+                self.db.alert_history.insert_many(documents, ordered=False)
+                return
+            except BulkWriteError as e:
+                errors = e.details.get("writeErrors", [])
+                if errors and all(error.get("code") == 11000 for error in errors):
+                    return
+                failure = e
+            except PyMongoError as e:
+                failure = e
+            if attempt < attempts:
+                time.sleep(0.2 * attempt)
+        logger.error("Alert history write failed, %d firings have no history row: %s",
+                     len(documents), failure, extra={"alert_history": documents})
@@ -0,0 +1,145 @@
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from pymongo.errors import OperationFailure, PyMongoError
+
+logger = logging.getLogger(__name__)
+
+# Only the fields the checker needs to evaluate and fire an alert
+ALERT_PROJECTION = {
+    "email": 1,
+    "symbol": 1,
+    "target_price": 1,
+    "condition": 1,
+    "params": 1,
+    "triggered": 1,
+    "updated_at": 1,
+}
+
+
+class AlertIndexSync:
+    """Keeps an AlertIndex current with the ``alerts`` collection.
+
+    One projected load of the untriggered alerts seeds the index; after that
+    a change stream applies inserts, updates and deletes as they happen. On
+    a standalone mongod without change streams it falls back to polling an
+    ``updated_at`` cursor, with a periodic id-only pass to pick up deletes.
+    Each poll re-reads the last ``poll_overlap`` seconds, because writers stamp
+    ``updated_at`` on their own clocks before the write lands; the periodic
+    pass also adds back any untriggered alert the polls still missed.
+    """
+
+    def __init__(self, collection, index, poll_interval=5, reconcile_every=12, poll_overlap=60):
+        self.collection = collection
+        self.index = index
+        self.poll_interval = poll_interval
+        self.reconcile_every = reconcile_every
+        self.poll_overlap = poll_overlap
+        self.mode = None
+        self._cursor = None
+        self._resume_token = None
+        self._stream = None
+        self._thread = None
+
+    def load(self):
+        """Seed the index with every untriggered alert.
+
+        The change stream is opened before the seed query, so alerts written
+        while it runs are replayed onto the index rather than missed.
+        """
+        cursor = datetime.utcnow()
+        try:
+            stream, mode = self._open_stream(), "change_stream"
+        except OperationFailure as e:
+            logger.warning("Change streams unavailable (%s), polling alerts instead", e)
+            stream, mode = None, "polling"
+        self.index.load(self.collection.find({"triggered": False}, ALERT_PROJECTION))
+        self._cursor, self._stream, self.mode = cursor, stream, mode
+
+    def start(self):
+        """Follow changes on a daemon thread, seeding the index there first if ``load`` was not called"""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="alert-sync", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while self.mode is None:
+            try:
+                self.load()
+            except PyMongoError as e:
+                logger.warning("Alert index load error: %s", e)
+                time.sleep(self.poll_interval)
+        while self.mode != "polling":
+            try:
+                self._watch()
+            except OperationFailure as e:
+                logger.warning("Change streams unavailable (%s), polling alerts instead", e)
+                self.mode = "polling"
+            except PyMongoError as e:
+                logger.warning("Alert change stream error: %s", e)
+                time.sleep(self.poll_interval)
+        self._poll()
+
+    def _open_stream(self):
+        pipeline = [{"$project": {
+            "operationType": 1,
+            "documentKey": 1,
+            **{f"fullDocument.{field}": 1 for field in ALERT_PROJECTION},
+        }}]
+        stream = self.collection.watch(pipeline, full_document="updateLookup",
+                                       start_after=self._resume_token)
+        # The post-batch token marks where the stream started even before any event
+        self._resume_token = stream.resume_token or self._resume_token
+        return stream
+
+    def _watch(self):
+        stream, self._stream = self._stream, None
+        if stream is None:
+            stream = self._open_stream()
+        with stream:
+            for change in stream:
+                self.apply(change)
+                self._resume_token = stream.resume_token
+
+    def apply(self, change):
+        """Apply one change-stream event to the index"""
+        if change["operationType"] in ("insert", "update", "replace"):
+            document = change.get("fullDocument")
+            if document is not None:
+                self.index.add(document)
+                return
+        self.index.remove(change["documentKey"]["_id"])
+
+    def _poll(self):
+        polls = 0
+        while True:
+            time.sleep(self.poll_interval)
+            try:
+                cursor = self._cursor
+                # Re-applying a document is idempotent; missing a late-landing one is not
+                changed = self.collection.find(
+                    {"updated_at": {"$gte": cursor - timedelta(seconds=self.poll_overlap)}}, ALERT_PROJECTION
+                ).sort("updated_at", 1)
+                for document in changed:
+                    self.index.add(document)
+                    cursor = max(cursor, document["updated_at"])
+                self._cursor = cursor
+                polls += 1
+                if polls % self.reconcile_every == 0:
+                    self._reconcile()
+            except PyMongoError as e:
+                logger.warning("Alert poll error: %s", e)
+
+    def _reconcile(self):
+        """Drop indexed alerts that were deleted or triggered elsewhere, and add missing live ones"""
+        live = {doc["_id"] for doc in self.collection.find({"triggered": False}, {"_id": 1})}
+        indexed = self.index.ids()
+        for alert_id in indexed - {str(_id) for _id in live}:
+            self.index.remove(alert_id)
+        missing = [_id for _id in live if str(_id) not in indexed]
+        if missing:
+            logger.info("Alert reconcile found %d alerts the polls missed", len(missing))
+            self.index.add_many(self.collection.find({"_id": {"$in": missing}, "triggered": False},
+                                                     ALERT_PROJECTION))
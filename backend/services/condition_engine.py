@@ -0,0 +1,288 @@
+import math
+import threading
+from datetime import datetime
+import numpy as np
+
+# Window-based alert conditions and the params each one needs; windows are seconds
+CONDITION_PARAMS = {
+    "pct_change": ("window", "threshold"),
+    "ma_cross": ("short_window", "long_window", "direction"),
+    "high_break": ("window",),
+    "low_break": ("window",),
+    "volume_spike": ("window", "multiplier"),
+}
+
+
+def validate_condition(condition, params, max_window=None):
+    """Return (clean_params, error) for a window-based alert condition.
+
+    ``max_window`` caps lookbacks at the tick history actually kept in memory.
+    """
+    if condition not in CONDITION_PARAMS:
+        return None, f"Unknown condition '{condition}'"
+    params = params or {}
+    clean = {}
+    for name in CONDITION_PARAMS[condition]:
+        if name not in params:
+            return None, f"'{condition}' alerts need params.{name}"
+        if name == "direction":
+            if params[name] not in ("above", "below"):
+                return None, "params.direction must be 'above' or 'below'"
+            clean[name] = params[name]
+            continue
+        try:
+            clean[name] = float(params[name])
+        except (TypeError, ValueError):
+            return None, f"params.{name} must be a number"
+        if not math.isfinite(clean[name]):
+            return None, f"params.{name} must be a finite number"
+        if name != "threshold" and clean[name] <= 0:
+            return None, f"params.{name} must be positive"
+        if name.endswith("window") and max_window and clean[name] > max_window:
+            return None, f"params.{name} can be at most {max_window:.0f} seconds"
+    if condition == "ma_cross" and clean["short_window"] >= clean["long_window"]:
+        return None, "params.short_window must be shorter than params.long_window"
+    return clean, None
+
+
+def build_alert(user_email, data, max_window=None):
+    """(alert document, error) from one alert's request JSON"""
+    if not isinstance(data, dict):
+        return None, "Alert must be an object"
+    symbol = data.get("symbol")
+    if not isinstance(symbol, str) or not symbol.strip():
+        return None, "symbol is required"
+    condition = data.get("condition")
+    alert = {
+        "email": user_email,
+        "symbol": symbol.strip().upper(),
+        "condition": condition,
+        "triggered": False,
+        "created_at": datetime.utcnow()
+    }
+    if condition in ("above", "below"):
+        try:
+            alert["target_price"] = float(data["target_price"])
+        except (KeyError, TypeError, ValueError):
+            return None, "target_price must be a number"
+        # A NaN target would break the sorted threshold order for every alert on the symbol
+        if not math.isfinite(alert["target_price"]):
+            return None, "target_price must be a finite number"
+    else:
+        params, error = validate_condition(condition, data.get("params"), max_window)
+        if error:
+            return None, error
+        alert["params"] = params
+    alert["updated_at"] = alert["created_at"]
+    return alert, None
+
+
+class _Group:
+    """Columnar params for every alert of one condition type on one symbol"""
+
+    def __init__(self, condition, entries):
+        self.ids = [entry["_id"] for entry in entries]
+        self.columns = {}
+        for name in CONDITION_PARAMS[condition]:
+            values = [entry["params"][name] for entry in entries]
+            if name == "direction":
+                self.columns[name] = np.array([value == "above" for value in values])
+            else:
+                self.columns[name] = np.array(values, dtype=np.float64)
+        windows = self.columns.get("long_window", self.columns.get("window"))
+        self.max_window = float(windows.max())
+        self.windows = windows
+
+
+class ConditionEngine:
+    """Evaluates window-based alert conditions with one NumPy pass per symbol.
+
+    Alerts are grouped by symbol and condition into parameter arrays, so every
+    alert of a type is checked against the symbol's recent tick window with
+    vectorised index arithmetic instead of a per-alert Python loop. An alert
+    only fires once the window holds enough history to cover its longest
+    lookback, which keeps a freshly started process from firing on partial data.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._alerts = {}    # alert_id -> entry
+        self._symbols = {}   # symbol -> {condition: set(alert_id)}
+        self._groups = {}    # (symbol, condition) -> _Group, rebuilt lazily
+
+    def __len__(self):
+        return len(self._alerts)
+
+    def load(self, alerts):
+        with self._lock:
+            self._alerts, self._symbols, self._groups = {}, {}, {}
+            for alert in alerts:
+                entry = self._entry(alert)
+                if entry is not None:
+                    self._insert(entry)
+
+    def add(self, alert):
+        entry = self._entry(alert)
+        with self._lock:
+            self._remove(str(alert["_id"]))
+            if entry is not None:
+                self._insert(entry)
+
+    def add_many(self, alerts):
+        entries = [(str(alert["_id"]), self._entry(alert)) for alert in alerts]
+        with self._lock:
+            for alert_id, entry in entries:
+                self._remove(alert_id)
+                if entry is not None:
+                    self._insert(entry)
+
+    def remove(self, alert_id):
+        with self._lock:
+            return self._remove(str(alert_id)) is not None
+
+    def ids(self):
+        with self._lock:
+            return set(self._alerts)
+
+    def symbols(self):
+        with self._lock:
+            return set(self._symbols)
+
+    def count(self, symbols):
+        with self._lock:
+            return sum(len(ids) for symbol in symbols
+                       for ids in self._symbols.get(symbol, {}).values())
+
+    def max_window(self, symbol):
+        """Longest lookback in seconds any alert on ``symbol`` needs"""
+        with self._lock:
+            groups = [self._group(symbol, condition) for condition in self._symbols.get(symbol, {})]
+        return max((group.max_window for group in groups), default=0.0)
+
+    def evaluate(self, symbol, timestamps, prices, volumes=None):
+        """Pop and return every alert on ``symbol`` whose condition holds on this window"""
+        with self._lock:
+            conditions = list(self._symbols.get(symbol, {}))
+            groups = [(condition, self._group(symbol, condition)) for condition in conditions]
+        if not groups:
+            return []
+
+        ts = np.asarray(timestamps, dtype=np.float64)
+        px = np.asarray(prices, dtype=np.float64)
+        vol = None if volumes is None else np.asarray(volumes, dtype=np.float64)
+        if len(px) < 3:
+            return []
+        window = _Window(ts, px, vol)
+
+        fired = []
+        for condition, group in groups:
+            hit = getattr(window, condition)(group.columns)
+            hit &= window.covers(group.windows)
+            fired.extend(group.ids[i] for i in np.flatnonzero(hit))
+
+        with self._lock:
+            return [entry for entry in map(self._remove, fired) if entry is not None]
+
+    def _insert(self, entry):
+        self._alerts[entry["_id"]] = entry
+        self._symbols.setdefault(entry["symbol"], {}).setdefault(entry["condition"], set()).add(entry["_id"])
+        self._groups.pop((entry["symbol"], entry["condition"]), None)
+
+    def _remove(self, alert_id):
+        entry = self._alerts.pop(alert_id, None)
+        if entry is None:
+            return None
+        conditions = self._symbols.get(entry["symbol"], {})
+        ids = conditions.get(entry["condition"], set())
+        ids.discard(alert_id)
+        if not ids:
+            conditions.pop(entry["condition"], None)
+        if not conditions:
+            self._symbols.pop(entry["symbol"], None)
+        self._groups.pop((entry["symbol"], entry["condition"]), None)
+        return entry
+
+    def _group(self, symbol, condition):
+        key = (symbol, condition)
+        group = self._groups.get(key)
+        if group is None:
+            ids = self._symbols[symbol][condition]
+            group = self._groups[key] = _Group(condition, [self._alerts[i] for i in ids])
+        return group
+
+    @staticmethod
+    def _entry(alert):
+        if alert.get("triggered") or alert.get("condition") not in CONDITION_PARAMS:
+            return None
+        return {
+            "_id": str(alert["_id"]),
+            "email": alert["email"],
+            "symbol": alert["symbol"],
+            "condition": alert["condition"],
+            "params": alert["params"],
+            "target_price": alert.get("target_price"),
+        }
+
+
+class _Window:
+    """One symbol's tick window with the shared prefix arrays every condition reuses"""
+
+    def __init__(self, ts, px, vol):
+        self.ts, self.px, self.vol = ts, px, vol
+        self.n = len(px)
+        self.now = px[-1]
+        self.csum = np.concatenate(([0.0], np.cumsum(px)))
+
+    def covers(self, windows):
+        """Alerts whose lookback is fully inside the held history"""
+        return self.ts[0] <= self.ts[-1] - windows
+
+    def start(self, windows, end=None):
+        """Index of the first tick inside each lookback ending at tick ``end - 1``"""
+        end = self.n if end is None else end
+        return np.searchsorted(self.ts, self.ts[end - 1] - windows, side="left")
+
+    def pct_change(self, columns):
+        base = self.px[np.minimum(self.start(columns["window"]), self.n - 2)]
+        change = (self.now / base - 1.0) * 100.0
+        threshold = columns["threshold"]
+        return np.where(threshold >= 0, change >= threshold, change <= threshold)
+
+    def _moving_average(self, windows, end):
+        start = np.minimum(self.start(windows, end), end - 1)
+        return (self.csum[end] - self.csum[start]) / (end - start)
+
+    def ma_cross(self, columns):
+        short_now = self._moving_average(columns["short_window"], self.n)
+        long_now = self._moving_average(columns["long_window"], self.n)
+        short_prev = self._moving_average(columns["short_window"], self.n - 1)
+        long_prev = self._moving_average(columns["long_window"], self.n - 1)
+        crossed_up = (short_prev <= long_prev) & (short_now > long_now)
+        crossed_down = (short_prev >= long_prev) & (short_now < long_now)
+        return np.where(columns["direction"], crossed_up, crossed_down)
+
+    def _prior_start(self, windows):
+        # Lookback over the ticks before the latest one
+        return np.minimum(self.start(windows), self.n - 2)
+
+    def high_break(self, columns):
+        suffix_max = np.maximum.accumulate(self.px[-2::-1])[::-1]
+        return self.now > suffix_max[self._prior_start(columns["window"])]
+
+    def low_break(self, columns):
+        suffix_min = np.minimum.accumulate(self.px[-2::-1])[::-1]
+        return self.now < suffix_min[self._prior_start(columns["window"])]
+
+    def volume_spike(self, columns):
+        if self.vol is None:
+            return np.zeros(len(columns["window"]), dtype=bool)
+        # GLOBAL_QUOTE volume is cumulative for the day; a drop means a new session
+        increments = np.clip(np.diff(self.vol), 0, None)
+        latest = increments[-1]
+        prior_sum = np.concatenate(([0.0], np.cumsum(increments[:-1])))
+        start = np.minimum(self.start(columns["window"]), self.n - 2)
+        # increments[k] is the volume traded up to tick k + 1
+        first = np.maximum(start - 1, 0)
+        count = (self.n - 2) - first
+        mean = (prior_sum[-1] - prior_sum[first]) / np.maximum(count, 1)
+        return (count > 0) & (mean > 0) & (latest >= columns["multiplier"] * mean)
@@ -0,0 +1,68 @@
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+
+from utils.metrics import registry
+
+LOGINS_THROTTLED = registry.counter("logins_throttled_total", "Login attempts refused before the password check",
+                                    labels=("scope",))
+
+
+class LoginLimiter:
+    """In-memory sliding-window limit on failed logins per client IP and per account.
+
+    Each key keeps the times of its recent failures, at most the limit, so
+    a check is a dict lookup and needs neither MongoDB nor the KDF. Keys
+    are evicted least recently failed first beyond ``maxsize``, which
+    bounds memory under a spray of addresses. Limits are per process.
+    """
+
+    def __init__(self, max_per_ip=20, max_per_account=5, window=900, maxsize=100000):
+        self.limits = {"ip": max_per_ip, "account": max_per_account}
+        self.window = window
+        self.maxsize = maxsize
+        self._failures = OrderedDict()  # (scope, key) -> deque of failure times
+        self._lock = threading.Lock()
+
+    def retry_after(self, ip, email):
+        """Seconds until ``ip`` and ``email`` may try again; 0 if allowed now"""
+        now = time.monotonic()
+        wait = 0.0
+        with self._lock:
+            for scope, key in (("ip", ip), ("account", email.lower())):
+                failures = self._failures.get((scope, key))
+                limit = self.limits[scope]
+                if not limit or failures is None or len(failures) < limit:
+                    continue
+                blocked = failures[0] + self.window - now
+                if blocked > 0:
+                    LOGINS_THROTTLED.inc(scope=scope)
+                    wait = max(wait, blocked)
+        return wait
+
+    def record_failure(self, ip, email):
+        now = time.monotonic()
+        with self._lock:
+            for scope, key in (("ip", ip), ("account", email.lower())):
+                if not self.limits[scope]:
+                    continue
+                failures = self._failures.pop((scope, key), None)
+                if failures is None:
+                    failures = deque(maxlen=self.limits[scope])
+                failures.append(now)
+                self._failures[(scope, key)] = failures
+            while len(self._failures) > self.maxsize:
+                self._failures.popitem(last=False)
+
+    def reset(self, email):
+        """Forget an account's failures after a successful login"""
+        with self._lock:
+            self._failures.pop(("account", email.lower()), None)
+
+
+login_limiter = LoginLimiter(
+    max_per_ip=int(os.getenv("LOGIN_MAX_FAILURES_PER_IP", 20)),
+    max_per_account=int(os.getenv("LOGIN_MAX_FAILURES_PER_ACCOUNT", 5)),
+    window=float(os.getenv("LOGIN_FAILURE_WINDOW", 900))
+)
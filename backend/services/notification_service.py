@@ -0,0 +1,225 @@
+import logging
+import os
+import queue
+import smtplib
+import threading
+import time
+from utils.helpers import build_alert_message
+from utils.metrics import EMAIL_SEND_SECONDS, registry
+
+logger = logging.getLogger(__name__)
+
+
+class EmailNotifier:
+    """Bounded queue of triggered alerts drained by a pool of SMTP workers.
+
+    Each worker keeps one authenticated SMTP connection open and reuses it
+    across messages. Failed sends are retried with exponential backoff. With
+    ``digest_window`` > 0, alerts for one user that arrive within the window
+    are merged into a single message. ``notify`` never blocks the caller.
+    """
+
+    def __init__(self, host, port, username=None, password=None, sender=None,
+                 sender_name=None, use_tls=True, workers=2, queue_size=10000,
+                 max_retries=3, backoff=2.0, digest_window=0, timeout=30):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.sender = sender or username
+        self.sender_name = sender_name
+        self.use_tls = use_tls
+        self.workers = workers
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.digest_window = digest_window
+        self.timeout = timeout
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._digests = {}  # email -> (first_queued_at, [alerts])
+        self._timers = set()  # backoff timers of retries not yet re-queued
+        self._lock = threading.Lock()
+        self._threads = []
+        self._stopping = threading.Event()
+        self.sent = 0
+        self.failed = 0
+        self.dropped = 0
+        self.retried = 0
+
+    def start(self):
+        with self._lock:
+            if self._threads:
+                return
+            self._stopping.clear()
+            for i in range(self.workers):
+                self._spawn(self._work, f"email-worker-{i}")
+            if self.digest_window:
+                self._spawn(self._flush_digests, "email-digest")
+
+    def notify(self, to_email, symbol, price, condition, target_price=None, params=None):
+        """Queue one triggered alert for delivery; returns False if it was dropped"""
+        self.start()
+        alert = {"symbol": symbol, "price": price, "condition": condition,
+                 "target_price": target_price, "params": params}
+        if self.digest_window:
+            with self._lock:
+                digest = self._digests.setdefault(to_email, (time.monotonic(), []))
+                digest[1].append(alert)
+            return True
+        return self._enqueue(to_email, [alert], 0)
+
+    def flush(self):
+        """Queue every pending digest now, regardless of its age"""
+        self._flush_due(force=True)
+
+    def join(self):
+        """Block until every queued message and pending retry has been sent or given up on"""
+        self.flush()
+        while True:
+            # A failed send registers its retry timer before the worker marks it done
+            self._queue.join()
+            with self._lock:
+                timers = list(self._timers)
+            if not timers:
+                return
+            for timer in timers:
+                timer.join()
+
+    def stop(self):
+        self.join()
+        self._stopping.set()
+        with self._lock:
+            timers, self._timers = self._timers, set()
+        for timer in timers:
+            timer.cancel()
+            self.dropped += len(timer.args[2])
+        for _ in range(self.workers):
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def stats(self):
+        return {
+            "queued": self._queue.qsize(),
+            "pending_digests": len(self._digests),
+            "pending_retries": len(self._timers),
+            "sent": self.sent,
+            "failed": self.failed,
+            "retried": self.retried,
+            "dropped": self.dropped,
+        }
+
+    def _spawn(self, target, name):
+        thread = threading.Thread(target=target, name=name, daemon=True)
+        thread.start()
+        self._threads.append(thread)
+
+    def _enqueue(self, to_email, alerts, attempt):
+        try:
+            self._queue.put_nowait((to_email, alerts, attempt))
+            return True
+        except queue.Full:
+            self.dropped += len(alerts)
+            logger.warning("Email queue full, dropped %d alert(s) for %s", len(alerts), to_email)
+            return False
+
+    def _flush_digests(self):
+        while not self._stopping.wait(min(1.0, self.digest_window)):
+            self._flush_due()
+
+    def _flush_due(self, force=False):
+        now = time.monotonic()
+        with self._lock:
+            due = [email for email, (queued_at, _) in self._digests.items()
+                   if force or now - queued_at >= self.digest_window]
+            batches = [(email, self._digests.pop(email)[1]) for email in due]
+        for email, alerts in batches:
+            self._enqueue(email, alerts, 0)
+
+    def _connect(self):
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        if self.use_tls:
+            server.starttls()
+        if self.username and self.password:
+            server.login(self.username, self.password)
+        return server
+
+    def _work(self):
+        server = None
+        while True:
+            item = self._queue.get()
+            if item is None:
+                self._queue.task_done()
+                break
+            to_email, alerts, attempt = item
+            message = build_alert_message(self.sender, to_email, alerts, self.sender_name)
+            started = time.perf_counter()
+            try:
+                try:
+                    server = server or self._connect()
+                    server.send_message(message)
+                except smtplib.SMTPServerDisconnected:
+                    # Idle connection was closed by the server; reconnect once
+                    server = self._connect()
+                    server.send_message(message)
+                self.sent += 1
+                EMAIL_SEND_SECONDS.observe(time.perf_counter() - started)
+            except Exception as e:
+                server = self._close(server)
+                self._retry(to_email, alerts, attempt, e)
+            finally:
+                self._queue.task_done()
+        self._close(server)
+
+    def _retry(self, to_email, alerts, attempt, error):
+        if attempt >= self.max_retries:
+            self.failed += 1
+            logger.error("Email failed for %s after %d attempts: %s", to_email, attempt + 1, error)
+            return
+        self.retried += 1
+        timer = threading.Timer(self.backoff * 2 ** attempt, self._retry_due)
+        timer.args = (timer, to_email, alerts, attempt + 1)
+        timer.daemon = True
+        with self._lock:
+            self._timers.add(timer)
+        timer.start()
+
+    def _retry_due(self, timer, to_email, alerts, attempt):
+        try:
+            if self._stopping.is_set():
+                self.dropped += len(alerts)
+                logger.warning("Notifier stopped, dropped retry of %d alert(s) for %s", len(alerts), to_email)
+            else:
+                self._enqueue(to_email, alerts, attempt)
+        finally:
+            # Only after re-queueing, so join() never sees neither the timer nor the message
+            with self._lock:
+                self._timers.discard(timer)
+
+    @staticmethod
+    def _close(server):
+        if server is not None:
+            try:
+                server.quit()
+            except Exception:
+                pass
+        return None
+
+
+email_notifier = EmailNotifier(
+    host=os.getenv("SMTP_HOST", "smtp.gmail.com"),
+    port=int(os.getenv("SMTP_PORT", 587)),
+    username=os.getenv("EMAIL_USER"),
+    password=os.getenv("EMAIL_PASS"),
+    sender_name=os.getenv("EMAIL_FROM_NAME"),
+    use_tls=os.getenv("SMTP_STARTTLS", "true").lower() == "true",
+    workers=int(os.getenv("EMAIL_WORKERS", 2)),
+    queue_size=int(os.getenv("EMAIL_QUEUE_SIZE", 10000)),
+    max_retries=int(os.getenv("EMAIL_MAX_RETRIES", 3)),
+    digest_window=float(os.getenv("EMAIL_DIGEST_WINDOW", 0))
+)
+
+registry.gauge("email_queue_depth", "Messages waiting for an SMTP worker").set_function(
+    lambda: email_notifier.stats()["queued"])
+registry.counter("emails_total", "Alert emails by outcome", labels=("result",)).set_function(
+    lambda: {(result,): email_notifier.stats()[result] for result in ("sent", "failed", "retried", "dropped")})
@@ -0,0 +1,112 @@
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+from utils.metrics import registry
+
+PASSWORD_HASH_SECONDS = registry.histogram(
+    "password_hash_seconds", "Password hash and verify latency including queueing", labels=("op",))
+PASSWORD_HASH_REJECTED = registry.counter(
+    "password_hash_rejected_total", "Password hash jobs refused because the pool queue was full")
+
+
+class HasherBusy(Exception):
+    """Raised when the hashing pool has no room for another job"""
+
+    def __init__(self, retry_after):
+        super().__init__(f"Password hashing is at capacity, retry in {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+class PasswordHasher:
+    """Password KDF calls off the request path, on a bounded worker pool.
+
+    At most ``workers`` hashes run at once and ``queue_size`` more may
+    wait; past that ``hash``/``verify`` raise HasherBusy straight away, so a
+    login burst is answered with 503s instead of queueing behind the KDF
+    and starving every other request. Under the threading server the pool
+    is a process pool. Under gevent or eventlet it is a native thread pool
+    instead, since forking after monkey patching is unsafe and
+    the werkzeug KDFs (hashlib pbkdf2 and scrypt) release the GIL anyway.
+    ``workers=0`` hashes inline on the calling thread.
+
+    ``method`` is a werkzeug method string such as "pbkdf2:sha256:600000"
+    or "scrypt:32768:8:1"; hashes made with other settings report
+    ``needs_rehash`` so they can be upgraded at the next login.
+    """
+
+    def __init__(self, method="pbkdf2:sha256:600000", workers=2, queue_size=32, async_mode="threading"):
+        self.method = method
+        self.workers = workers
+        self.queue_size = queue_size
+        self.async_mode = async_mode
+        self._pool = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._seconds = 0.3  # running mean job time, for Retry-After
+
+    def hash(self, password):
+        return self._run("hash", generate_password_hash, password, self.method)
+
+    def verify(self, pwhash, password):
+        return self._run("verify", check_password_hash, pwhash, password)
+
+    def needs_rehash(self, pwhash):
+        """True if ``pwhash`` was not made with every part of ``method`` given"""
+        wanted = self.method.split(":")
+        return pwhash.split("$", 1)[0].split(":")[:len(wanted)] != wanted
+
+    def in_flight(self):
+        return self._in_flight
+
+    def _run(self, op, function, *args):
+        with self._lock:
+            if self.workers and self._in_flight >= self.workers + self.queue_size:
+                PASSWORD_HASH_REJECTED.inc()
+                # The queue drains ``workers`` jobs per mean job time
+                raise HasherBusy(self._seconds * (self._in_flight / self.workers))
+            self._in_flight += 1
+        started = time.perf_counter()
+        try:
+            if not self.workers:
+                return function(*args)
+            return self._submit(function, *args)
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self._in_flight -= 1
+                self._seconds += (elapsed - self._seconds) * 0.1
+            PASSWORD_HASH_SECONDS.observe(elapsed, op=op)
+
+    def _submit(self, function, *args):
+        if self.async_mode == "eventlet":
+            # eventlet's native pool is process-wide, sized by EVENTLET_THREADPOOL_SIZE
+            from eventlet import tpool
+            return tpool.execute(function, *args)
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    if self.async_mode == "gevent":
+                        from gevent.threadpool import ThreadPoolExecutor
+                        self._pool = ThreadPoolExecutor(max_workers=self.workers)
+                    else:
+                        # Forking would copy locks held by the server's other threads into the child
+                        methods = multiprocessing.get_all_start_methods()
+                        context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+                        self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=context)
+        return self._pool.submit(function, *args).result()
+
+
+password_hasher = PasswordHasher(
+    method=os.getenv("PASSWORD_HASH_METHOD", "pbkdf2:sha256:600000"),
+    workers=int(os.getenv("PASSWORD_HASH_WORKERS", min(4, os.cpu_count() or 1))),
+    queue_size=int(os.getenv("PASSWORD_HASH_QUEUE_SIZE", 32)),
+    async_mode=os.getenv("SOCKETIO_ASYNC_MODE", "threading")
+)
+
+registry.gauge("password_hash_in_flight", "Password hash jobs running or queued").set_function(
+    password_hasher.in_flight)
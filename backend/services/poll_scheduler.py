@@ -0,0 +1,226 @@
+import heapq
+import math
+import re
+import threading
+import time
+from datetime import datetime, time as dt_time, timedelta, timezone
+from zoneinfo import ZoneInfo
+from services.symbol_catalog import DEFAULT_EXCHANGE, EXCHANGES, symbol_catalog
+from utils.metrics import registry
+
+POLL_INTERVAL_SECONDS = registry.histogram(
+    "poll_interval_seconds", "Intervals chosen by the adaptive poll schedulers", labels=("scheduler",),
+    buckets=(5, 10, 15, 30, 60, 120, 300, 600, 900, 1800, 3600))
+
+_OFFSET = re.compile(r"^UTC\s*([+-]\d+(?:\.\d+)?)?$")
+
+# Alpha Vantage ticker suffixes for non-US listings missing from the catalogue
+_SUFFIX_EXCHANGES = {".BSE": "BSE", ".BO": "BSE", ".NSE": "NSE", ".NS": "NSE"}
+
+
+class MarketSession:
+    """Regular trading hours of one exchange, Monday to Friday.
+
+    ``tz`` is an IANA zone such as "America/New_York", so sessions follow
+    daylight saving, or a fixed offset in the SYMBOL_SEARCH shape ("UTC-04",
+    "UTC+5.5") for exchanges without a known zone. Hours are "09:30" style.
+    Exchange holidays are not modelled.
+    """
+
+    def __init__(self, market_open="09:30", market_close="16:00", tz="America/New_York"):
+        self.open = _minutes(market_open)
+        self.close = _minutes(market_close)
+        match = _OFFSET.match(tz.strip().upper())
+        if match:
+            self.tz = timezone(timedelta(hours=float(match.group(1) or 0)))
+        else:
+            self.tz = ZoneInfo(tz)
+
+    def is_open(self, now=None):
+        local = datetime.fromtimestamp(time.time() if now is None else now, self.tz)
+        minute = local.hour * 60 + local.minute
+        return local.weekday() < 5 and self.open <= minute < self.close
+
+    def seconds_until_open(self, now=None):
+        """0 while open, else seconds until the next weekday open"""
+        now = time.time() if now is None else now
+        if self.is_open(now):
+            return 0.0
+        today = datetime.fromtimestamp(now, self.tz).date()
+        for days in range(8):
+            day = today + timedelta(days=days)
+            if day.weekday() >= 5:
+                continue
+            # Wall-clock open on that day, converted with the offset in force then
+            opens = datetime.combine(day, dt_time(self.open // 60, self.open % 60), self.tz).timestamp()
+            if opens > now:
+                return opens - now
+        return 0.0
+
+
+_sessions = {}
+
+# Zone of each SYMBOL_SEARCH region, from the exchanges the catalogue knows
+_REGION_ZONES = {exchange[0]: exchange[5] for exchange in EXCHANGES.values()}
+
+
+def market_session(symbol):
+    """MarketSession for ``symbol`` from the listing catalogue, by ticker suffix, or US hours"""
+    session = _sessions.get(symbol)
+    if session is None:
+        match = symbol_catalog.lookup(symbol)
+        if match is not None:
+            fields = (match["5. marketOpen"], match["6. marketClose"],
+                      _REGION_ZONES.get(match["4. region"], match["7. timezone"]))
+        else:
+            suffix = next((s for s in _SUFFIX_EXCHANGES if symbol.upper().endswith(s)), None)
+            exchange = EXCHANGES[_SUFFIX_EXCHANGES[suffix]] if suffix else DEFAULT_EXCHANGE
+            fields = (exchange[1], exchange[2], exchange[5])
+        session = _sessions[symbol] = MarketSession(*fields)
+    return session
+
+
+class PollScheduler:
+    """Per-symbol next-poll deadlines in a heap, with intervals fitted to a call budget.
+
+    While a symbol's market is closed it is polled once after the close and
+    then at the next open (or every ``closed_interval``). While open, the
+    interval is a diffusion estimate of how long the price needs to cover
+    the relative gap to its nearest alert threshold, ``(gap / sigma)^2 / 4``
+    with ``sigma`` the per-second volatility of recent ticks, so symbols
+    about to fire are polled often and quiet ones rarely. Live subscribers
+    cap the interval so screens stay fresh. If the resulting polls per
+    minute exceed ``budget_per_minute``, every interval is stretched by the
+    same factor, keeping the relative priorities. The budget may be a
+    callable, read at every reschedule, so it follows a governor whose
+    share of the API key changes.
+
+    ``session(symbol)``, ``volatility(symbol)``, ``distance(symbol, price)``
+    and ``subscribers(symbol)`` are optional callables; without them a
+    symbol is polled every ``base_interval``.
+    """
+
+    def __init__(self, budget_per_minute=None, session=market_session, volatility=None,
+                 distance=None, subscribers=None, base_interval=60, min_interval=5,
+                 max_interval=900, subscriber_interval=10, closed_interval=3600, name="alerts"):
+        self.budget_per_minute = budget_per_minute
+        self.session = session
+        self.volatility = volatility
+        self.distance = distance
+        self.subscribers = subscribers
+        self.base_interval = base_interval
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.subscriber_interval = subscriber_interval
+        self.closed_interval = closed_interval
+        self.name = name
+        self._lock = threading.Lock()
+        self._tracked = set()
+        self._heap = []        # (deadline, symbol); entries not matching _deadlines are stale
+        self._deadlines = {}   # symbol -> pending deadline; absent while a poll is under way
+        self._prices = {}      # symbol -> last price seen
+        self._rates = {}       # symbol -> polls per minute at its unstretched interval
+        self._total_rate = 0.0
+
+    def __len__(self):
+        return len(self._tracked)
+
+    def __contains__(self, symbol):
+        return symbol in self._tracked
+
+    def track(self, symbol, now=None):
+        """Start scheduling ``symbol``; it is due immediately"""
+        with self._lock:
+            if symbol not in self._tracked:
+                self._tracked.add(symbol)
+                self._push(symbol, time.time() if now is None else now)
+
+    def untrack(self, symbol):
+        with self._lock:
+            self._tracked.discard(symbol)
+            self._deadlines.pop(symbol, None)
+            self._prices.pop(symbol, None)
+            self._total_rate -= self._rates.pop(symbol, 0.0)
+
+    def sync(self, symbols, now=None):
+        """Track exactly ``symbols``"""
+        symbols = set(symbols)
+        for symbol in self._tracked - symbols:
+            self.untrack(symbol)
+        for symbol in symbols - self._tracked:
+            self.track(symbol, now)
+
+    def due(self, now=None):
+        """Pop and return every symbol whose deadline has passed"""
+        now = time.time() if now is None else now
+        due = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                deadline, symbol = heapq.heappop(self._heap)
+                if self._deadlines.get(symbol) == deadline:
+                    del self._deadlines[symbol]
+                    due.append(symbol)
+        return due
+
+    def wait_time(self, now=None):
+        """Seconds until the next deadline, or None when nothing is scheduled"""
+        now = time.time() if now is None else now
+        with self._lock:
+            while self._heap and self._deadlines.get(self._heap[0][1]) != self._heap[0][0]:
+                heapq.heappop(self._heap)
+            return max(0.0, self._heap[0][0] - now) if self._heap else None
+
+    def reschedule(self, symbol, price=None, now=None):
+        """Schedule the next poll of a symbol just polled; returns the interval chosen.
+
+        Symbols untracked while their poll was under way are left out.
+        """
+        now = time.time() if now is None else now
+        if symbol not in self._tracked:
+            return None
+        if price:
+            self._prices[symbol] = price
+        ideal, market_open = self._ideal(symbol, self._prices.get(symbol), now)
+        with self._lock:
+            if symbol not in self._tracked:
+                return None
+            interval = ideal
+            if market_open:
+                rate = 60.0 / ideal
+                self._total_rate += rate - self._rates.get(symbol, 0.0)
+                self._rates[symbol] = rate
+                budget = self.budget_per_minute() if callable(self.budget_per_minute) else self.budget_per_minute
+                if budget and self._total_rate > budget:
+                    interval = ideal * self._total_rate / budget
+            else:
+                self._total_rate -= self._rates.pop(symbol, 0.0)
+            self._push(symbol, now + interval)
+        POLL_INTERVAL_SECONDS.observe(interval, scheduler=self.name)
+        return interval
+
+    def _ideal(self, symbol, price, now):
+        """(interval before budget stretching, whether the market is open)"""
+        session = self.session(symbol) if self.session else None
+        if session is not None and not session.is_open(now):
+            # The first poll after the close picks up the closing price; then wait for the open
+            until_open = session.seconds_until_open(now)
+            return max(self.min_interval, min(self.closed_interval, until_open)), False
+
+        interval = self.base_interval
+        sigma = self.volatility(symbol) if self.volatility else None
+        gap = self.distance(symbol, price) if self.distance and price else None
+        if sigma and gap is not None:
+            interval = (gap / sigma) ** 2 / 4
+        subscribers = self.subscribers(symbol) if self.subscribers else 0
+        if subscribers:
+            interval = min(interval, self.subscriber_interval / (1 + math.log10(subscribers)))
+        return min(max(interval, self.min_interval), self.max_interval), True
+
+    def _push(self, symbol, deadline):
+        self._deadlines[symbol] = deadline
+        heapq.heappush(self._heap, (deadline, symbol))
+
+
+def _minutes(hhmm):
+    hours, minutes = hhmm.split(":")
+    return int(hours) * 60 + int(minutes)
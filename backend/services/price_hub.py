@@ -0,0 +1,227 @@
+import json
+import logging
+import threading
+import time
+
+import msgpack
+
+from services.poll_scheduler import PollScheduler
+from utils.metrics import BROADCAST_FLUSH_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+class _Client:
+    """Per-socket subscription and delta state"""
+
+    __slots__ = ("symbols", "sent", "encoding", "in_flight_since")
+
+    def __init__(self, encoding):
+        self.symbols = set()
+        self.sent = {}               # symbol -> price last delivered to this client
+        self.encoding = encoding
+        self.in_flight_since = None  # set while a frame is waiting for its ack
+
+
+class PriceHub:
+    """Shared price fan-out: one scheduled poller, one batched frame per client.
+
+    Subscriptions are reference counted per symbol, so upstream calls scale
+    with the number of distinct symbols being watched. A single task polls
+    whichever symbols the ``scheduler`` reports due, in one batched
+    ``fetch_prices(symbols)`` call; without a scheduler every symbol is
+    polled each ``interval`` seconds.
+    Every ``broadcast_interval`` each client gets at most one ``stock_batch``
+    frame holding only the symbols whose price moved by more than
+    ``epsilon`` (relative) since that client last saw them. Frames are JSON
+    or, when negotiated at subscribe time, MessagePack. A client that has not
+    acked its previous frame is skipped, and the next frame it gets carries
+    only the latest prices, so slow consumers never build up a backlog.
+    """
+
+    def __init__(self, socketio, fetch_prices, interval=10, broadcast_interval=1.0,
+                 epsilon=0.0, ack_timeout=30, scheduler=None):
+        self.socketio = socketio
+        self.fetch_prices = fetch_prices
+        self.interval = interval
+        if scheduler is None:
+            scheduler = PollScheduler(session=None, base_interval=interval, name="hub")
+        self.scheduler = scheduler
+        self.broadcast_interval = broadcast_interval
+        self.epsilon = epsilon
+        self.ack_timeout = ack_timeout
+        self._lock = threading.Lock()
+        self._refcounts = {}      # symbol -> number of subscribed sids
+        self._clients = {}        # sid -> _Client
+        self._last_prices = {}    # symbol -> latest polled price
+        self._polling = False
+        self._broadcasting = False
+        self.frames_sent = 0
+        self.frames_skipped = 0
+        self.bytes_sent = 0
+
+    def subscribe(self, sid, symbols, encoding="json"):
+        """Register ``sid`` for ``symbols``; returns the (upper-cased) symbols that were new for it"""
+        symbols = [symbol.upper() for symbol in symbols]
+        added = []
+        with self._lock:
+            client = self._clients.get(sid)
+            if client is None:
+                client = self._clients[sid] = _Client(encoding)
+            client.encoding = encoding or client.encoding
+            for symbol in symbols:
+                if symbol in client.symbols:
+                    continue
+                client.symbols.add(symbol)
+                self._refcounts[symbol] = self._refcounts.get(symbol, 0) + 1
+                added.append(symbol)
+                self.scheduler.track(symbol)
+            start_polling = bool(added) and not self._polling
+            self._polling = self._polling or start_polling
+            start_broadcast = not self._broadcasting
+            self._broadcasting = True
+        if start_polling:
+            self.socketio.start_background_task(self._poll)
+        if start_broadcast:
+            self.socketio.start_background_task(self._broadcast)
+        return added
+
+    def unsubscribe(self, sid, symbols):
+        """Drop ``sid`` from ``symbols``; returns the symbols it actually left"""
+        symbols = [symbol.upper() for symbol in symbols]
+        removed = []
+        with self._lock:
+            client = self._clients.get(sid)
+            if client is None:
+                return removed
+            for symbol in symbols:
+                if symbol not in client.symbols:
+                    continue
+                client.symbols.discard(symbol)
+                client.sent.pop(symbol, None)
+                self._release(symbol)
+                removed.append(symbol)
+            if not client.symbols:
+                self._clients.pop(sid, None)
+        return removed
+
+    def disconnect(self, sid):
+        """Release every subscription held by ``sid``"""
+        with self._lock:
+            client = self._clients.pop(sid, None)
+            for symbol in client.symbols if client else ():
+                self._release(symbol)
+
+    def last_price(self, symbol):
+        return self._last_prices.get(symbol)
+
+    def observe(self, symbol, price):
+        """Record a price obtained outside the pollers, e.g. for a first subscriber"""
+        if price:
+            self._last_prices[symbol] = price
+
+    def subscriber_count(self, symbol):
+        return self._refcounts.get(symbol, 0)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "clients": len(self._clients),
+                "symbols": dict(self._refcounts),
+                "scheduled": len(self.scheduler),
+                "frames_sent": self.frames_sent,
+                "frames_skipped": self.frames_skipped,
+                "bytes_sent": self.bytes_sent,
+            }
+
+    def push(self, sid):
+        """Send ``sid`` its pending changes now, ignoring backpressure"""
+        with self._lock:
+            client = self._clients.get(sid)
+        if client is not None:
+            self._send(sid, client, force=True)
+
+    def flush(self):
+        """Send every client one batched frame of its changed symbols"""
+        with self._lock:
+            clients = list(self._clients.items())
+        with BROADCAST_FLUSH_SECONDS.time():
+            for sid, client in clients:
+                self._send(sid, client)
+
+    def _send(self, sid, client, force=False):
+        now = time.monotonic()
+        with self._lock:
+            # Subscribe, unsubscribe and acks change the client's state concurrently
+            changes = {}
+            for symbol in client.symbols:
+                price = self._last_prices.get(symbol)
+                if price is None:
+                    continue
+                last = client.sent.get(symbol)
+                if last is None or abs(price - last) > self.epsilon * abs(last):
+                    changes[symbol] = price
+            if not changes:
+                return
+            if not force and client.in_flight_since is not None:
+                if now - client.in_flight_since < self.ack_timeout:
+                    # Still waiting on the last frame; skip and send only the latest later
+                    self.frames_skipped += 1
+                    return
+            client.sent.update(changes)
+            client.in_flight_since = now
+            self.frames_sent += 1
+        frame = {"ts": time.time(), "prices": changes}
+        if client.encoding == "msgpack":
+            frame = msgpack.packb(frame)
+            self.bytes_sent += len(frame)
+        else:
+            self.bytes_sent += len(json.dumps(frame))
+        self.socketio.emit("stock_batch", frame, to=sid,
+                           callback=lambda *args: self._acked(client))
+
+    def _acked(self, client):
+        with self._lock:
+            client.in_flight_since = None
+
+    def _release(self, symbol):
+        count = self._refcounts.get(symbol, 0) - 1
+        if count > 0:
+            self._refcounts[symbol] = count
+        else:
+            self._refcounts.pop(symbol, None)
+            self._last_prices.pop(symbol, None)
+            self.scheduler.untrack(symbol)
+
+    def _poll(self):
+        """Poll the due symbols in one batch while anyone is subscribed to anything"""
+        while True:
+            with self._lock:
+                if not self._refcounts:
+                    self._polling = False
+                    return
+            due = self.scheduler.due()
+            prices = {}
+            if due:
+                try:
+                    prices = self.fetch_prices(due)
+                    with self._lock:
+                        for symbol, price in prices.items():
+                            if price and symbol in self._refcounts:
+                                self._last_prices[symbol] = price
+                except Exception as e:
+                    logger.warning("Update error for %s: %s", due, e)
+                for symbol in due:
+                    self.scheduler.reschedule(symbol, prices.get(symbol))
+            # Wake at least once a second so new subscriptions are polled promptly
+            wait = self.scheduler.wait_time()
+            self.socketio.sleep(1.0 if wait is None else min(wait, 1.0))
+
+    def _broadcast(self):
+        """Single task that batches and sends every client's changes"""
+        while True:
+            self.socketio.sleep(self.broadcast_interval)
+            try:
+                self.flush()
+            except Exception as e:
+                logger.exception("Broadcast error: %s", e)
@@ -0,0 +1,159 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class _Flight:
+    """A single upstream fetch that concurrent callers for one key wait on"""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.discarded = False  # invalidated while loading; result must not be cached
+
+
+class QuoteCache:
+    """Thread-safe TTL + LRU cache with single-flight loading.
+
+    Concurrent misses for the same key share one call to the loader; only
+    non-None values are cached so failed fetches are retried on the next call.
+    Expired entries stay in place until evicted so ``stale`` can serve them
+    when the upstream refuses a refresh.
+    """
+
+    def __init__(self, ttl=30, maxsize=1024):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._inflight = {}            # key -> _Flight
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def get(self, key, loader):
+        """Return the cached value for ``key``, calling ``loader(key)`` on a miss"""
+        with self._lock:
+            value = self._lookup(key)
+            if value is not None:
+                self.hits += 1
+                return value
+            flight = self._inflight.get(key)
+            if flight is not None:
+                self.coalesced += 1
+                leader = False
+            else:
+                self.misses += 1
+                flight = self._inflight[key] = _Flight()
+                leader = True
+
+        if not leader:
+            flight.event.wait()
+            return flight.value
+
+        try:
+            flight.value = loader(key)
+        finally:
+            with self._lock:
+                self._land(key, flight)
+            flight.event.set()
+        return flight.value
+
+    def get_many(self, keys, loader_many):
+        """Batch ``get``: misses not already in flight go to one ``loader_many(keys)`` call.
+
+        ``loader_many`` returns a {key: value} mapping; keys it leaves out are
+        treated as failed fetches. Returns {key: value} for the keys that resolved.
+        """
+        results, waiting, leading = {}, {}, {}
+        with self._lock:
+            for key in dict.fromkeys(keys):
+                value = self._lookup(key)
+                if value is not None:
+                    self.hits += 1
+                    results[key] = value
+                elif key in self._inflight:
+                    self.coalesced += 1
+                    waiting[key] = self._inflight[key]
+                else:
+                    self.misses += 1
+                    leading[key] = self._inflight[key] = _Flight()
+
+        if leading:
+            loaded = {}
+            try:
+                loaded = loader_many(list(leading)) or {}
+            finally:
+                with self._lock:
+                    for key, flight in leading.items():
+                        flight.value = loaded.get(key)
+                        self._land(key, flight)
+                for flight in leading.values():
+                    flight.event.set()
+            results.update((key, flight.value) for key, flight in leading.items())
+
+        for key, flight in waiting.items():
+            flight.event.wait()
+            results[key] = flight.value
+        return {key: value for key, value in results.items() if value is not None}
+
+    def peek(self, key):
+        """Return a fresh cached value without loading or touching the counters"""
+        with self._lock:
+            return self._lookup(key)
+
+    def stale(self, key):
+        """Return the last cached value for ``key`` even if it has expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry[1] if entry is not None else None
+
+    def put(self, key, value):
+        with self._lock:
+            self._store(key, value)
+
+    def invalidate(self, key):
+        """Drop ``key``; a load already in flight for it finishes but is not cached"""
+        with self._lock:
+            self._entries.pop(key, None)
+            flight = self._inflight.pop(key, None)
+            if flight is not None:
+                flight.discarded = True
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses + self.coalesced
+            return {
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "size": len(self._entries),
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+    def _lookup(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def _land(self, key, flight):
+        # Caller holds the lock. After an invalidate a newer flight may own the key
+        if self._inflight.get(key) is flight:
+            del self._inflight[key]
+        if flight.value is not None and not flight.discarded:
+            self._store(key, flight.value)
+
+    def _store(self, key, value):
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
@@ -0,0 +1,288 @@
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+
+import aiohttp
+import requests
+from requests.adapters import HTTPAdapter
+
+from services.rate_governor import PRIORITY_ALERT, PRIORITY_SEARCH, RateLimited
+from utils.metrics import UPSTREAM_ERRORS, UPSTREAM_RATE_LIMITED, UPSTREAM_SECONDS
+
+logger = logging.getLogger(__name__)
+
+ALPHA_VANTAGE_URL = os.getenv("ALPHA_VANTAGE_URL", "https://www.alphavantage.co/query")
+
+
+def parse_global_quote(data):
+    """Extract (price, volume) from a GLOBAL_QUOTE payload; price is None if absent"""
+    quote = data.get("Global Quote") or {}
+    if "05. price" not in quote:
+        return None, float("nan")
+    return float(quote["05. price"]), float(quote.get("06. volume") or "nan")
+
+
+def csv_notice(text):
+    """The JSON notice Alpha Vantage sends in place of a CSV download, or None"""
+    if not text.lstrip().startswith("{"):
+        return None
+    try:
+        return json.loads(text)
+    except ValueError:
+        return None
+
+
+def record_upstream(endpoint, started, data=None, error=False):
+    """Update the upstream_* metrics for one Alpha Vantage call begun at ``started``"""
+    UPSTREAM_SECONDS.observe(time.perf_counter() - started, endpoint=endpoint)
+    if error:
+        UPSTREAM_ERRORS.inc(endpoint=endpoint)
+    elif isinstance(data, dict) and ("Note" in data or "Information" in data):
+        # Alpha Vantage answers over-quota calls with 200 and a notice instead of data
+        UPSTREAM_RATE_LIMITED.inc(endpoint=endpoint, source="upstream")
+
+
+def refuse(endpoint, governor, priority):
+    """Count a call the local governor turned down and build the error for it"""
+    UPSTREAM_RATE_LIMITED.inc(endpoint=endpoint, source="governor")
+    return RateLimited(governor.retry_after(priority))
+
+
+class QuoteEngine:
+    """Asyncio quote fetcher with a pooled keep-alive client, run on its own thread.
+
+    Fetches for many symbols run concurrently under a semaphore, and each one
+    must win a token from the shared rate governor, so a batch finishes in
+    roughly the slowest response rather than the sum of all of them. Symbols
+    refused by the governor are left out of the result instead of waiting.
+    ``fetch``/``fetch_many`` are the blocking facade used by the Flask and
+    Socket.IO code. ``on_quote(symbol, price, volume)`` is called for every
+    quote received.
+    """
+
+    def __init__(self, governor, max_concurrency=8, timeout=10, on_quote=None):
+        self.governor = governor
+        self.on_quote = on_quote
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self._loop = None
+        self._thread = None
+        self._session = None
+        self._semaphore = None
+        self._start_lock = threading.Lock()
+
+    def start(self):
+        with self._start_lock:
+            if self._loop is not None:
+                return
+            self._loop = asyncio.new_event_loop()
+            self._thread = threading.Thread(target=self._loop.run_forever,
+                                            name="quote-engine", daemon=True)
+            self._thread.start()
+
+    def fetch(self, symbol, priority=PRIORITY_ALERT):
+        """Blocking fetch of one symbol's price"""
+        return self.fetch_many([symbol], priority).get(symbol)
+
+    def fetch_many(self, symbols, priority=PRIORITY_ALERT):
+        """Blocking concurrent fetch; returns {symbol: price} for the ones that succeeded"""
+        symbols = list(dict.fromkeys(symbols))
+        if not symbols:
+            return {}
+        self.start()
+        future = asyncio.run_coroutine_threadsafe(self._fetch_many(symbols, priority), self._loop)
+        return future.result()
+
+    def search(self, keywords, priority=PRIORITY_SEARCH):
+        """Blocking SYMBOL_SEARCH call; raises RateLimited if the governor refuses it"""
+        if not self.governor.try_acquire(priority):
+            raise refuse("SYMBOL_SEARCH", self.governor, priority)
+        self.start()
+        future = asyncio.run_coroutine_threadsafe(self._search(keywords), self._loop)
+        return future.result()
+
+    def listing_status(self, priority=PRIORITY_SEARCH):
+        """Blocking LISTING_STATUS download of every active listing as CSV text"""
+        if not self.governor.try_acquire(priority):
+            raise refuse("LISTING_STATUS", self.governor, priority)
+        self.start()
+        future = asyncio.run_coroutine_threadsafe(self._listing_status(), self._loop)
+        return future.result()
+
+    def close(self):
+        if self._loop is None:
+            return
+        if self._session is not None:
+            asyncio.run_coroutine_threadsafe(self._session.close(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop = self._thread = self._session = None
+
+    async def _ensure_session(self):
+        if self._session is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.max_concurrency, keepalive_timeout=60),
+                timeout=aiohttp.ClientTimeout(total=self.timeout)
+            )
+        return self._session
+
+    async def _fetch_many(self, symbols, priority):
+        session = await self._ensure_session()
+        prices = await asyncio.gather(*(self._fetch(session, symbol, priority) for symbol in symbols))
+        return {symbol: price for symbol, price in zip(symbols, prices) if price is not None}
+
+    async def _fetch(self, session, symbol, priority):
+        params = {
+            "function": "GLOBAL_QUOTE",
+            "symbol": symbol,
+            "apikey": os.getenv("ALPHA_VANTAGE_KEY"),
+        }
+        async with self._semaphore:
+            if not self.governor.try_acquire(priority):
+                refuse("GLOBAL_QUOTE", self.governor, priority)
+                return None
+            started = time.perf_counter()
+            try:
+                async with session.get(ALPHA_VANTAGE_URL, params=params) as response:
+                    if response.status != 200:
+                        record_upstream("GLOBAL_QUOTE", started, error=True)
+                        return None
+                    data = await response.json(content_type=None)
+                record_upstream("GLOBAL_QUOTE", started, data)
+                price, volume = parse_global_quote(data)
+            except Exception as e:
+                record_upstream("GLOBAL_QUOTE", started, error=True)
+                logger.warning("Price fetch error for %s: %s", symbol, e)
+                return None
+        if price is not None and self.on_quote is not None:
+            self.on_quote(symbol, price, volume)
+        return price
+
+    async def _search(self, keywords):
+        session = await self._ensure_session()
+        params = {
+            "function": "SYMBOL_SEARCH",
+            "keywords": keywords,
+            "apikey": os.getenv("ALPHA_VANTAGE_KEY"),
+        }
+        async with self._semaphore:
+            started = time.perf_counter()
+            try:
+                async with session.get(ALPHA_VANTAGE_URL, params=params) as response:
+                    response.raise_for_status()
+                    data = await response.json(content_type=None)
+            except Exception:
+                record_upstream("SYMBOL_SEARCH", started, error=True)
+                raise
+            record_upstream("SYMBOL_SEARCH", started, data)
+            return data
+
+    async def _listing_status(self):
+        session = await self._ensure_session()
+        params = {"function": "LISTING_STATUS", "apikey": os.getenv("ALPHA_VANTAGE_KEY")}
+        started = time.perf_counter()
+        try:
+            async with session.get(ALPHA_VANTAGE_URL, params=params,
+                                   timeout=aiohttp.ClientTimeout(total=120)) as response:
+                response.raise_for_status()
+                text = await response.text()
+        except Exception:
+            record_upstream("LISTING_STATUS", started, error=True)
+            raise
+        record_upstream("LISTING_STATUS", started, csv_notice(text))
+        return text
+
+
+class GreenQuoteEngine:
+    """Greenlet flavour of QuoteEngine for servers running under gevent or eventlet.
+
+    Same public API, but fetches run on a bounded green pool over one
+    keep-alive ``requests.Session``. With the server monkey-patched these
+    calls are cooperative, so no asyncio loop or native thread is needed.
+    """
+
+    def __init__(self, governor, max_concurrency=8, timeout=10, on_quote=None, async_mode="gevent"):
+        self.governor = governor
+        self.on_quote = on_quote
+        self.timeout = timeout
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_concurrency)
+        self._session.mount("https://", adapter)
+        self._session.mount("http://", adapter)
+        if async_mode == "eventlet":
+            import eventlet
+            self._pool = eventlet.GreenPool(max_concurrency)
+        else:
+            from gevent.pool import Pool
+            self._pool = Pool(max_concurrency)
+
+    def start(self):
+        pass
+
+    def fetch(self, symbol, priority=PRIORITY_ALERT):
+        """Fetch one symbol's price"""
+        return self.fetch_many([symbol], priority).get(symbol)
+
+    def fetch_many(self, symbols, priority=PRIORITY_ALERT):
+        """Concurrent fetch on the green pool; returns {symbol: price} for the ones that succeeded"""
+        symbols = list(dict.fromkeys(symbols))
+        prices = self._pool.imap(lambda symbol: self._fetch(symbol, priority), symbols)
+        return {symbol: price for symbol, price in zip(symbols, prices) if price is not None}
+
+    def search(self, keywords, priority=PRIORITY_SEARCH):
+        """SYMBOL_SEARCH call; raises RateLimited if the governor refuses it"""
+        return self._get({"function": "SYMBOL_SEARCH", "keywords": keywords}, priority)
+
+    def listing_status(self, priority=PRIORITY_SEARCH):
+        """LISTING_STATUS download of every active listing as CSV text"""
+        return self._get({"function": "LISTING_STATUS"}, priority, timeout=120, csv=True)
+
+    def close(self):
+        self._session.close()
+
+    def _get(self, params, priority, timeout=None, csv=False):
+        """Parsed JSON body of one call, or its text for ``csv`` downloads"""
+        endpoint = params["function"]
+        if not self.governor.try_acquire(priority):
+            raise refuse(endpoint, self.governor, priority)
+        started = time.perf_counter()
+        try:
+            response = self._session.get(ALPHA_VANTAGE_URL,
+                                         params={**params, "apikey": os.getenv("ALPHA_VANTAGE_KEY")},
+                                         timeout=timeout or self.timeout)
+            response.raise_for_status()
+            data = csv_notice(response.text) if csv else response.json()
+        except Exception:
+            record_upstream(endpoint, started, error=True)
+            raise
+        record_upstream(endpoint, started, data)
+        return response.text if csv else data
+
+    def _fetch(self, symbol, priority):
+        if not self.governor.try_acquire(priority):
+            refuse("GLOBAL_QUOTE", self.governor, priority)
+            return None
+        started = time.perf_counter()
+        try:
+            response = self._session.get(ALPHA_VANTAGE_URL, params={
+                "function": "GLOBAL_QUOTE",
+                "symbol": symbol,
+                "apikey": os.getenv("ALPHA_VANTAGE_KEY"),
+            }, timeout=self.timeout)
+            if response.status_code != 200:
+                record_upstream("GLOBAL_QUOTE", started, error=True)
+                return None
+            data = response.json()
+            record_upstream("GLOBAL_QUOTE", started, data)
+            price, volume = parse_global_quote(data)
+        except Exception as e:
+            record_upstream("GLOBAL_QUOTE", started, error=True)
+            logger.warning("Price fetch error for %s: %s", symbol, e)
+            return None
+        if price is not None and self.on_quote is not None:
+            self.on_quote(symbol, price, volume)
+        return price
@@ -0,0 +1,85 @@
+import os
+import socket
+from services.quote_cache import QuoteCache
+from services.quote_engine import GreenQuoteEngine, QuoteEngine
+from services.rate_governor import RateGovernor, PRIORITY_ALERT, PRIORITY_UI
+from services.rate_share import RateShare
+from services.replay_source import ReplaySource, load_ticks
+from services.tick_store import TickStore
+from utils.metrics import registry
+
+# Every Alpha Vantage call in the process draws from this one budget
+rate_governor = RateGovernor(
+    rate_per_minute=float(os.getenv("ALPHA_VANTAGE_RATE_PER_MINUTE", 5)),
+    burst=float(os.getenv("ALPHA_VANTAGE_BURST", 0)) or None
+)
+
+# Once bound to MongoDB, the key's budget is split between every live web and worker process
+rate_share = RateShare(rate_governor, f"{socket.gethostname()}:{os.getpid()}",
+                       ttl=float(os.getenv("RATE_SHARE_TTL", 30)))
+
+# Shared by every caller in the process so one upstream fetch serves them all
+quote_cache = QuoteCache(
+    ttl=float(os.getenv("QUOTE_CACHE_TTL", 30)),
+    maxsize=int(os.getenv("QUOTE_CACHE_SIZE", 1024))
+)
+registry.gauge("quote_cache_hit_ratio", "Share of quote lookups served from the cache").set_function(
+    lambda: quote_cache.stats()["hit_ratio"])
+registry.gauge("quote_cache_entries", "Symbols held in the quote cache").set_function(
+    lambda: quote_cache.stats()["size"])
+registry.counter("quote_cache_lookups_total", "Quote cache lookups by result", labels=("result",)).set_function(
+    lambda: {(result,): count for result, count in quote_cache.stats().items()
+             if result in ("hits", "misses", "coalesced")})
+
+# Every price fetched upstream, kept per symbol for history and windowed alerts
+tick_history_seconds = float(os.getenv("TICK_HISTORY_HOURS", 6)) * 3600
+tick_store = TickStore(
+    capacity=int(tick_history_seconds / float(os.getenv("TICK_SPACING", 5))),
+    flush_interval=float(os.getenv("TICK_FLUSH_INTERVAL", 30))
+)
+
+# Pooled, concurrent upstream client. Under gevent/eventlet the green engine is
+# used so fetches cooperate with the server's event loop instead of a thread
+ASYNC_MODE = os.getenv("SOCKETIO_ASYNC_MODE", "threading")
+engine_options = {
+    "max_concurrency": int(os.getenv("QUOTE_MAX_CONCURRENCY", 8)),
+    "timeout": float(os.getenv("QUOTE_TIMEOUT", 10)),
+    "on_quote": tick_store.record,
+}
+if ASYNC_MODE in ("gevent", "eventlet"):
+    quote_engine = GreenQuoteEngine(rate_governor, async_mode=ASYNC_MODE, **engine_options)
+else:
+    quote_engine = QuoteEngine(rate_governor, **engine_options)
+
+# Where prices come from: any object with fetch(symbol, priority) and
+# fetch_many(symbols, priority) -> {symbol: price}. Alpha Vantage by default;
+# QUOTE_SOURCE=replay plays back recorded ticks instead. Search always goes
+# to Alpha Vantage
+quote_source = quote_engine
+if os.getenv("QUOTE_SOURCE", "alphavantage") == "replay":
+    quote_source = ReplaySource(load_ticks(os.environ["QUOTE_REPLAY_PATH"]),
+                                speed=float(os.getenv("QUOTE_REPLAY_SPEED", 1)),
+                                on_quote=tick_store.record)
+    quote_source.start()
+
+def set_quote_source(source):
+    """Serve every later price lookup from ``source``; cached quotes are dropped"""
+    global quote_source
+    quote_source = source
+    quote_cache.clear()
+
+def fetch_quote(symbol, priority=PRIORITY_UI):
+    """Fetch current stock price from the quote source, bypassing the cache"""
+    return quote_source.fetch(symbol, priority)
+
+def get_current_price(symbol, priority=PRIORITY_UI):
+    """Current stock price from the shared cache, falling back to the last
+    known price when the rate governor refuses a refresh"""
+    symbol = symbol.upper()
+    price = quote_cache.get(symbol, lambda key: fetch_quote(key, priority))
+    return price if price is not None else quote_cache.stale(symbol)
+
+def get_prices(symbols, priority=PRIORITY_ALERT):
+    """{symbol: price} for many symbols; cache misses are fetched concurrently"""
+    return quote_cache.get_many([symbol.upper() for symbol in symbols],
+                                lambda keys: quote_source.fetch_many(keys, priority))
@@ -0,0 +1,93 @@
+import threading
+import time
+
+PRIORITY_ALERT = "alert"
+PRIORITY_UI = "ui"
+PRIORITY_SEARCH = "search"
+
+
+class RateLimited(Exception):
+    """Raised when the governor refuses an upstream call"""
+
+    def __init__(self, retry_after):
+        super().__init__(f"Upstream rate limit reached, retry in {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+class RateGovernor:
+    """Thread-safe token bucket shared by every Alpha Vantage call in the process.
+
+    Lower priority classes must leave a reserve of tokens in the bucket, so
+    when the budget runs low the remaining calls go to alert evaluation first,
+    then UI refresh, then search. ``try_acquire`` never sleeps: callers that
+    are refused should answer from cache or with a 429. When several
+    processes use one API key, ``set_share`` gives this one its part of the
+    key's refill rate. The bucket size and reserves stay whole, so every
+    priority can still be granted however many processes share the key.
+    """
+
+    def __init__(self, rate_per_minute=5, burst=None, reserves=None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = float(burst or rate_per_minute)
+        if reserves is None:
+            reserves = {
+                PRIORITY_ALERT: 0,
+                PRIORITY_UI: round(self.capacity * 0.2),
+                PRIORITY_SEARCH: round(self.capacity * 0.4),
+            }
+        self.reserves = reserves
+        # A reserve the bucket can never exceed would lock its priority out for good
+        self.capacity = max(self.capacity, max(reserves.values(), default=0) + 1)
+        self.share = 1.0
+        self._full_rate = self.rate
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self.granted = {priority: 0 for priority in reserves}
+        self.denied = {priority: 0 for priority in reserves}
+
+    def try_acquire(self, priority=PRIORITY_ALERT):
+        """Take one token for ``priority`` if its reserve allows; never blocks"""
+        with self._lock:
+            self._refill()
+            if self._tokens - 1 >= self.reserves.get(priority, 0):
+                self._tokens -= 1
+                self.granted[priority] = self.granted.get(priority, 0) + 1
+                return True
+            self.denied[priority] = self.denied.get(priority, 0) + 1
+            return False
+
+    def retry_after(self, priority=PRIORITY_ALERT):
+        """Seconds until a token would be available to ``priority``"""
+        with self._lock:
+            self._refill()
+            needed = self.reserves.get(priority, 0) + 1
+            missing = needed - self._tokens
+            if missing <= 0:
+                return 0.0
+            if needed > self.capacity or not self.rate:
+                return float("inf")
+            return missing / self.rate
+
+    def set_share(self, share):
+        """Refill at ``share`` (0-1] of the configured rate"""
+        with self._lock:
+            self._refill()
+            self.share = share
+            self.rate = self._full_rate * share
+
+    def stats(self):
+        with self._lock:
+            self._refill()
+            return {
+                "tokens": round(self._tokens, 3),
+                "capacity": self.capacity,
+                "share": self.share,
+                "granted": dict(self.granted),
+                "denied": dict(self.denied),
+            }
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
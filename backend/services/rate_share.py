@@ -0,0 +1,60 @@
+import logging
+import threading
+from datetime import datetime, timedelta
+from pymongo.errors import PyMongoError
+
+logger = logging.getLogger(__name__)
+
+
+class RateShare:
+    """Splits one Alpha Vantage key's budget between the processes calling it.
+
+    Every web and worker process heartbeats into ``holders`` and sizes its
+    RateGovernor to refill at 1 / live holders of the configured rate, so
+    together they stay within the key's limit however many are running. A
+    process that stops heartbeating drops out once its entry expires and
+    the others take back its share on their next heartbeat.
+    """
+
+    def __init__(self, governor, holder_id, ttl=30):
+        self.holders = None
+        self.governor = governor
+        self.holder_id = holder_id
+        self.ttl = ttl
+        self.live = 1
+        self._thread = None
+        self._stopping = threading.Event()
+
+    def bind(self, holders):
+        """Join the split through the ``holders`` collection and start heartbeating"""
+        self.holders = holders
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="rate-share", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Stop heartbeating and leave the split straight away"""
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join()
+        if self.holders is not None:
+            self.holders.delete_one({"_id": self.holder_id})
+
+    def _run(self):
+        while not self._stopping.is_set():
+            try:
+                self.heartbeat()
+            except PyMongoError as e:
+                logger.warning("Rate share heartbeat error for %s: %s", self.holder_id, e)
+            self._stopping.wait(self.ttl / 3)
+
+    def heartbeat(self):
+        """Renew this process's entry and resize the governor to its share"""
+        now = datetime.utcnow()
+        self.holders.update_one({"_id": self.holder_id},
+                                {"$set": {"expires_at": now + timedelta(seconds=self.ttl)}}, upsert=True)
+        live = max(1, self.holders.count_documents({"expires_at": {"$gt": now}}))
+        if live != self.live:
+            logger.info("Alpha Vantage budget split %d ways", live)
+        self.live = live
+        self.governor.set_share(1.0 / live)
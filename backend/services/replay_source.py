@@ -0,0 +1,178 @@
+import csv
+import os
+import threading
+import time
+from array import array
+from bisect import bisect_right
+from datetime import datetime, timezone
+
+# Column names accepted for each field, in the order they are tried
+TIMESTAMP_COLUMNS = ("timestamp", "ts", "time", "datetime", "date")
+PRICE_COLUMNS = ("price", "close", "05. price")
+VOLUME_COLUMNS = ("volume", "06. volume")
+
+
+def load_ticks(path, symbol=None):
+    """[(timestamp, symbol, price, volume)] from a CSV or Parquet file, sorted by time.
+
+    Files need a timestamp (epoch seconds or ISO 8601; naive times are UTC)
+    and a price or close column. Without a symbol column every row belongs
+    to ``symbol``, or to the file name, so Alpha Vantage
+    TIME_SERIES_INTRADAY CSV downloads load as they are. Parquet needs
+    pyarrow.
+    """
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+        rows = pq.read_table(path).to_pylist()
+    else:
+        with open(path, newline="", encoding="utf-8") as f:
+            rows = list(csv.DictReader(f))
+    default_symbol = (symbol or os.path.splitext(os.path.basename(path))[0]).upper()
+    ticks = []
+    for row in rows:
+        row = {str(key).strip().lower(): value for key, value in row.items()}
+        timestamp = _timestamp(_column(row, TIMESTAMP_COLUMNS))
+        volume = _column(row, VOLUME_COLUMNS)
+        ticks.append((
+            timestamp,
+            str(row.get("symbol") or default_symbol).strip().upper(),
+            float(_column(row, PRICE_COLUMNS)),
+            float(volume) if volume not in (None, "") else float("nan"),
+        ))
+    ticks.sort(key=lambda tick: tick[0])
+    return ticks
+
+
+def load_recorded_ticks(collection, symbols=None, start=None, end=None):
+    """[(timestamp, symbol, price, volume)] from the ``ticks`` collection the tick store flushes to"""
+    query = {}
+    if symbols:
+        query["symbol"] = {"$in": [symbol.upper() for symbol in symbols]}
+    if start or end:
+        query["ts"] = {**({"$gte": start} if start else {}), **({"$lt": end} if end else {})}
+    return [
+        (_timestamp(doc["ts"]), doc["symbol"], doc["price"], doc.get("volume", float("nan")))
+        for doc in collection.find(query, {"_id": 0, "ts": 1, "symbol": 1, "price": 1, "volume": 1}).sort("ts", 1)
+    ]
+
+
+class ReplaySource:
+    """Quote source that replays recorded ticks on a virtual clock.
+
+    Implements the ``fetch``/``fetch_many`` interface of the live quote
+    engines: a symbol's price is its last tick at or before the replay
+    clock, and every tick the clock has passed since the previous fetch is
+    handed to ``on_quote(symbol, price, volume, timestamp)`` with its
+    recorded time, so tick history and windowed alerts see the full stream.
+
+    Either ``start()`` the clock, which then runs ``speed`` times faster
+    than the wall clock from the first tick, or step it through the data
+    with ``replay()``, which sleeps to keep the same pace; a ``speed`` of 0
+    replays as fast as possible. The governor priority is accepted and
+    ignored, since replayed quotes cost no API calls.
+    """
+
+    def __init__(self, ticks, speed=1.0, on_quote=None):
+        self.speed = speed
+        self.on_quote = on_quote
+        columns = {}
+        events = {}
+        for timestamp, symbol, price, volume in sorted(ticks, key=lambda tick: tick[0]):
+            ts, px, vol = columns.setdefault(symbol, (array("d"), array("d"), array("d")))
+            ts.append(timestamp)
+            px.append(price)
+            vol.append(volume)
+            events.setdefault(timestamp, []).append(symbol)
+        self._columns = columns
+        self._events = sorted(events.items())
+        self._seen = {symbol: 0 for symbol in columns}  # ticks already passed to on_quote
+        self.start_time = self._events[0][0] if self._events else 0.0
+        self.end_time = self._events[-1][0] if self._events else 0.0
+        self._now = self.start_time
+        self._started = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return sum(len(ts) for ts, _, _ in self._columns.values())
+
+    def symbols(self):
+        return set(self._columns)
+
+    def start(self):
+        """Run the clock from the first tick at ``speed`` times real time"""
+        self._started = time.monotonic()
+
+    def now(self):
+        """Current replay time in epoch seconds"""
+        if self._started is None or not self.speed:
+            return self._now
+        return min(self.end_time, self.start_time + (time.monotonic() - self._started) * self.speed)
+
+    def replay(self):
+        """Step the clock through every distinct tick time; yields (timestamp, symbols ticking)"""
+        started = time.monotonic()
+        for timestamp, symbols in self._events:
+            if self.speed:
+                delay = (timestamp - self.start_time) / self.speed - (time.monotonic() - started)
+                if delay > 0:
+                    time.sleep(delay)
+            self._now = timestamp
+            yield timestamp, symbols
+
+    def fetch(self, symbol, priority=None):
+        return self.fetch_many([symbol], priority).get(symbol)
+
+    def fetch_many(self, symbols, priority=None):
+        """{symbol: price} at the replay clock for the symbols that have ticked by then"""
+        now = self.now()
+        prices = {}
+        passed = []
+        with self._lock:
+            for symbol in symbols:
+                columns = self._columns.get(symbol)
+                if columns is None:
+                    continue
+                ts, px, vol = columns
+                end = bisect_right(ts, now)
+                if not end:
+                    continue
+                prices[symbol] = px[end - 1]
+                seen = self._seen[symbol]
+                if end > seen:
+                    passed.extend((symbol, px[i], vol[i], ts[i]) for i in range(seen, end))
+                    self._seen[symbol] = end
+        if self.on_quote is not None:
+            for tick in passed:
+                self.on_quote(*tick)
+        return prices
+
+    def stats(self):
+        with self._lock:
+            replayed = sum(self._seen.values())
+        return {
+            "symbols": len(self._columns),
+            "ticks": len(self),
+            "ticks_replayed": replayed,
+            "start": self.start_time,
+            "end": self.end_time,
+            "now": self.now(),
+            "speed": self.speed,
+        }
+
+
+def _column(row, names):
+    for name in names:
+        if row.get(name) not in (None, ""):
+            return row[name]
+    raise ValueError(f"Tick row has none of the columns {', '.join(names)}")
+
+
+def _timestamp(value):
+    if isinstance(value, datetime):
+        return (value if value.tzinfo else value.replace(tzinfo=timezone.utc)).timestamp()
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float(value)
+    except ValueError:
+        return _timestamp(datetime.fromisoformat(value.strip()))
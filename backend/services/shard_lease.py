@@ -0,0 +1,114 @@
+import logging
+import math
+import random
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError, PyMongoError
+
+logger = logging.getLogger(__name__)
+
+
+def shard_for(symbol, shard_count):
+    """Map a symbol onto one of ``shard_count`` contiguous ranges of its CRC32 hash"""
+    return (zlib.crc32(symbol.upper().encode()) * shard_count) >> 32
+
+
+class ShardLeaseManager:
+    """Claims symbol hash ranges for one checker process through Mongo lease documents.
+
+    Every process heartbeats into ``workers`` and aims to hold
+    ceil(shards / live workers) leases in ``leases``. Leases are renewed on
+    every heartbeat; a lease whose holder stops renewing expires and is taken
+    over by another process. Ownership is trusted locally only until the
+    lease would have expired, so a stalled process stops evaluating before
+    anyone else can claim its shards.
+    """
+
+    def __init__(self, leases, workers, worker_id, shard_count=16, lease_ttl=30):
+        self.leases = leases
+        self.workers = workers
+        self.worker_id = worker_id
+        self.shard_count = shard_count
+        self.lease_ttl = lease_ttl
+        self._owned = frozenset()
+        self._valid_until = 0.0
+        self._thread = None
+        self._stopping = threading.Event()
+
+    def owns(self, symbol):
+        if time.monotonic() >= self._valid_until:
+            return False
+        return shard_for(symbol, self.shard_count) in self._owned
+
+    def owned_shards(self):
+        return sorted(self._owned) if time.monotonic() < self._valid_until else []
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="shard-leases", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Stop heartbeating and hand every lease back immediately"""
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join()
+        self._owned = frozenset()
+        self.leases.update_many({"owner": self.worker_id},
+                                {"$set": {"owner": None, "expires_at": datetime.utcnow()}})
+        self.workers.delete_one({"_id": self.worker_id})
+
+    def _run(self):
+        while not self._stopping.is_set():
+            try:
+                self.heartbeat()
+            except PyMongoError as e:
+                logger.warning("Lease heartbeat error for %s: %s", self.worker_id, e)
+            self._stopping.wait(self.lease_ttl / 3)
+
+    def heartbeat(self):
+        """Renew held leases, then release or claim shards to reach a fair share"""
+        started = time.monotonic()
+        now = datetime.utcnow()
+        expires_at = now + timedelta(seconds=self.lease_ttl)
+        self.workers.update_one({"_id": self.worker_id},
+                                {"$set": {"expires_at": expires_at}}, upsert=True)
+        live_workers = max(1, self.workers.count_documents({"expires_at": {"$gt": now}}))
+        target = math.ceil(self.shard_count / live_workers)
+
+        self.leases.update_many({"owner": self.worker_id, "expires_at": {"$gt": now}},
+                                {"$set": {"expires_at": expires_at}})
+        owned = {doc["_id"] for doc in self.leases.find(
+            {"owner": self.worker_id, "expires_at": {"$gt": now}}, {"_id": 1})}
+
+        for shard in sorted(owned)[target:]:
+            self.leases.update_one({"_id": shard, "owner": self.worker_id},
+                                   {"$set": {"owner": None, "expires_at": now}})
+            owned.discard(shard)
+
+        candidates = [shard for shard in range(self.shard_count) if shard not in owned]
+        random.shuffle(candidates)
+        for shard in candidates:
+            if len(owned) >= target:
+                break
+            if self._claim(shard, now, expires_at):
+                owned.add(shard)
+
+        self._owned = frozenset(owned)
+        self._valid_until = started + self.lease_ttl
+
+    def _claim(self, shard, now, expires_at):
+        try:
+            doc = self.leases.find_one_and_update(
+                {"_id": shard, "$or": [{"owner": None}, {"expires_at": {"$lte": now}}]},
+                {"$set": {"owner": self.worker_id, "expires_at": expires_at}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+        except DuplicateKeyError:
+            # Lease exists and is held by a live worker
+            return False
+        return doc is not None and doc["owner"] == self.worker_id
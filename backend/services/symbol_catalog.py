@@ -0,0 +1,165 @@
+import csv
+import io
+import os
+import re
+import threading
+from bisect import bisect_left
+
+DEFAULT_LISTING_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "listing_status.csv")
+
+# Session details per exchange, in the shape SYMBOL_SEARCH reports them, plus
+# the IANA zone the hours are in (the reported offset ignores daylight saving)
+EXCHANGES = {
+    "NYSE": ("United States", "09:30", "16:00", "UTC-04", "USD", "America/New_York"),
+    "NASDAQ": ("United States", "09:30", "16:00", "UTC-04", "USD", "America/New_York"),
+    "NYSE ARCA": ("United States", "09:30", "16:00", "UTC-04", "USD", "America/New_York"),
+    "NYSE MKT": ("United States", "09:30", "16:00", "UTC-04", "USD", "America/New_York"),
+    "BATS": ("United States", "09:30", "16:00", "UTC-04", "USD", "America/New_York"),
+    "BSE": ("India", "09:15", "15:30", "UTC+5.5", "INR", "Asia/Kolkata"),
+    "NSE": ("India", "09:15", "15:30", "UTC+5.5", "INR", "Asia/Kolkata"),
+}
+DEFAULT_EXCHANGE = EXCHANGES["NYSE"]
+
+# Scores for how a query term matched a listing, best first
+EXACT_SYMBOL, SYMBOL_PREFIX, NAME_PREFIX, WORD_PREFIX = 1.0, 0.9, 0.8, 0.6
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+class SymbolCatalog:
+    """Local symbol search over a LISTING_STATUS-style CSV.
+
+    Tickers, full names and individual name words are kept as one sorted
+    list of lowercase keys, so a typeahead prefix is a bisect plus a short
+    scan. Results use the SYMBOL_SEARCH ``bestMatches`` field names.
+    """
+
+    def __init__(self, path=DEFAULT_LISTING_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._listings = []
+        self._keys = []  # sorted [(key, kind, listing_idx)]
+        self._loaded = False
+
+    def __len__(self):
+        return len(self._listings)
+
+    def ensure_loaded(self):
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    self.load(self.path)
+
+    def load(self, path):
+        """(Re)build the catalogue from a CSV file on disk"""
+        with open(path, newline="", encoding="utf-8") as f:
+            self.load_csv(f.read())
+
+    def load_csv(self, text):
+        """(Re)build the catalogue from LISTING_STATUS CSV text"""
+        listings, keys = [], []
+        for row in csv.DictReader(io.StringIO(text)):
+            if row.get("status", "Active") != "Active" or not row.get("symbol"):
+                continue
+            idx = len(listings)
+            listings.append(self._match(row))
+            symbol, name = row["symbol"].lower(), (row.get("name") or "").lower()
+            keys.append((symbol, SYMBOL_PREFIX, idx))
+            if name:
+                keys.append((name, NAME_PREFIX, idx))
+                for word in set(_WORD.findall(name)[1:]):
+                    keys.append((word, WORD_PREFIX, idx))
+        keys.sort()
+        self._listings, self._keys, self._loaded = listings, keys, True
+
+    def search(self, query, limit=10):
+        """Ranked ``bestMatches`` entries for a typeahead query"""
+        self.ensure_loaded()
+        query = query.lower().strip()
+        terms = _WORD.findall(query)
+        if not query or not terms:
+            return []
+
+        keys = self._keys
+        scores = {}
+        # The whole query against tickers and full names, the first term against words
+        for prefix in dict.fromkeys((query, terms[0])):
+            pos = bisect_left(keys, (prefix,))
+            while pos < len(keys) and keys[pos][0].startswith(prefix):
+                key, kind, idx = keys[pos]
+                if kind == SYMBOL_PREFIX and key == query:
+                    kind = EXACT_SYMBOL
+                elif kind == WORD_PREFIX and prefix != terms[0]:
+                    kind = 0
+                if kind > scores.get(idx, 0):
+                    scores[idx] = kind
+                pos += 1
+
+        if len(terms) > 1:
+            # Every further term must also prefix a word of the name or the ticker
+            for idx in list(scores):
+                words = _WORD.findall(self._listings[idx]["2. name"].lower())
+                words.append(self._listings[idx]["1. symbol"].lower())
+                if not all(any(word.startswith(term) for word in words) for term in terms[1:]):
+                    del scores[idx]
+
+        ranked = sorted(scores.items(),
+                        key=lambda item: (-item[1], len(self._listings[item[0]]["1. symbol"]),
+                                          self._listings[item[0]]["1. symbol"]))
+        results = []
+        for idx, score in ranked[:limit]:
+            listing = self._listings[idx]
+            # Shorter tickers are closer to what was typed
+            closeness = len(query) / max(len(listing["1. symbol"]), len(query))
+            results.append({**listing, "9. matchScore": f"{score * (0.9 + 0.1 * closeness):.4f}"})
+        return results
+
+    def lookup(self, symbol):
+        """The listing for exactly ``symbol``, or None"""
+        self.ensure_loaded()
+        key = symbol.lower()
+        pos = bisect_left(self._keys, (key,))
+        while pos < len(self._keys) and self._keys[pos][0] == key:
+            if self._keys[pos][1] == SYMBOL_PREFIX:
+                return self._listings[self._keys[pos][2]]
+            pos += 1
+        return None
+
+    @staticmethod
+    def _match(row):
+        region, market_open, market_close, timezone, currency, _ = EXCHANGES.get(
+            (row.get("exchange") or "").upper(), DEFAULT_EXCHANGE)
+        return {
+            "1. symbol": row["symbol"],
+            "2. name": row.get("name", ""),
+            "3. type": "Equity" if row.get("assetType", "Stock") == "Stock" else row["assetType"],
+            "4. region": region,
+            "5. marketOpen": market_open,
+            "6. marketClose": market_close,
+            "7. timezone": timezone,
+            "8. currency": currency,
+        }
+
+
+symbol_catalog = SymbolCatalog(os.getenv("SYMBOL_LISTING_PATH", DEFAULT_LISTING_PATH))
+
+
+def refresh_listing(path=None):
+    """Download a fresh LISTING_STATUS CSV, write it to ``path`` and reload the catalogue"""
+    from services.quote_service import quote_engine
+
+    path = path or symbol_catalog.path
+    text = quote_engine.listing_status()
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        f.write(text)
+    symbol_catalog.path = path
+    symbol_catalog.load_csv(text)
+    return len(symbol_catalog)
+
+
+if __name__ == "__main__":
+    # python -m services.symbol_catalog  -> refresh the bundled listing file
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    print(f"Loaded {refresh_listing()} active listings into {symbol_catalog.path}")
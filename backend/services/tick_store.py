@@ -0,0 +1,145 @@
+import logging
+import math
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from datetime import datetime, timezone
+from pymongo.errors import PyMongoError
+
+logger = logging.getLogger(__name__)
+
+
+class TickRing:
+    """Fixed-size ring of (timestamp, price, volume) ticks held in ``array('d')`` columns"""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.timestamps = array("d", bytes(8 * capacity))
+        self.prices = array("d", bytes(8 * capacity))
+        self.volumes = array("d", bytes(8 * capacity))
+        self.head = 0    # next slot to write
+        self.count = 0   # valid ticks, up to capacity
+        self.total = 0   # ticks ever appended, used as the flush cursor
+
+    def append(self, timestamp, price, volume):
+        self.timestamps[self.head] = timestamp
+        self.prices[self.head] = price
+        self.volumes[self.head] = volume
+        self.head = (self.head + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+        self.total += 1
+
+    def columns(self, last=None):
+        """Chronological copies of the newest ``last`` ticks (all held ticks by default)"""
+        n = self.count if last is None else min(last, self.count)
+        start = (self.head - n) % self.capacity
+        if start + n <= self.capacity:
+            return tuple(column[start:start + n] for column in (self.timestamps, self.prices, self.volumes))
+        tail = self.capacity - start
+        return tuple(column[start:] + column[:n - tail]
+                     for column in (self.timestamps, self.prices, self.volumes))
+
+    def window(self, since):
+        """Ticks with timestamp >= ``since``"""
+        columns = self.columns()
+        cut = bisect_left(columns[0], since)
+        return tuple(column[cut:] for column in columns)
+
+
+class TickStore:
+    """Per-symbol tick rings for every observed quote, flushed in bulk to Mongo.
+
+    Each symbol keeps the last ``capacity`` ticks as columnar arrays, so a
+    history window is a bisect plus a few slices with no per-tick objects.
+    When bound to a collection, ticks appended since the previous flush are
+    written with one ``insert_many`` every ``flush_interval`` seconds.
+    """
+
+    def __init__(self, capacity=4320, flush_interval=30):
+        self.capacity = capacity
+        self.flush_interval = flush_interval
+        self.collection = None
+        self._rings = {}
+        self._flushed = {}  # symbol -> ring.total at the last flush
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def record(self, symbol, price, volume=float("nan"), timestamp=None):
+        timestamp = time.time() if timestamp is None else timestamp
+        with self._lock:
+            ring = self._rings.get(symbol)
+            if ring is None:
+                ring = self._rings[symbol] = TickRing(self.capacity)
+            ring.append(timestamp, price, volume)
+
+    def symbols(self):
+        with self._lock:
+            return list(self._rings)
+
+    def window(self, symbol, seconds):
+        """(timestamps, prices, volumes) arrays for the last ``seconds`` of ``symbol``"""
+        with self._lock:
+            ring = self._rings.get(symbol)
+            if ring is None:
+                return array("d"), array("d"), array("d")
+            return ring.window(time.time() - seconds)
+
+    def latest(self, symbol, count):
+        """(timestamps, prices, volumes) arrays for the newest ``count`` ticks of ``symbol``"""
+        with self._lock:
+            ring = self._rings.get(symbol)
+            if ring is None:
+                return array("d"), array("d"), array("d")
+            return ring.columns(count)
+
+    def volatility(self, symbol, count=120):
+        """Per-second volatility of log returns over the newest ``count`` ticks, or None"""
+        timestamps, prices, _ = self.latest(symbol, count)
+        returns = [
+            math.log(prices[i] / prices[i - 1]) / math.sqrt(timestamps[i] - timestamps[i - 1])
+            for i in range(1, len(prices))
+            if timestamps[i] > timestamps[i - 1] and prices[i - 1] > 0 and prices[i] > 0
+        ]
+        if len(returns) < 2:
+            return None
+        mean = sum(returns) / len(returns)
+        return math.sqrt(sum((r - mean) ** 2 for r in returns) / (len(returns) - 1)) or None
+
+    def bind(self, collection):
+        """Flush to ``collection`` (ideally a time-series collection) from now on"""
+        self.collection = collection
+        if self.flush_interval and self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="tick-flush", daemon=True)
+            self._thread.start()
+
+    def flush(self):
+        """Write every tick appended since the last flush; returns how many were written"""
+        if self.collection is None:
+            return 0
+        pending = []
+        with self._lock:
+            for symbol, ring in self._rings.items():
+                new = min(ring.total - self._flushed.get(symbol, 0), ring.count)
+                if new:
+                    pending.append((symbol, ring.columns(new), ring.total))
+        docs = [
+            {"symbol": symbol, "ts": datetime.fromtimestamp(ts, timezone.utc), "price": price,
+             **({} if math.isnan(volume) else {"volume": volume})}
+            for symbol, (timestamps, prices, volumes), _ in pending
+            for ts, price, volume in zip(timestamps, prices, volumes)
+        ]
+        if docs:
+            self.collection.insert_many(docs, ordered=False)
+            with self._lock:
+                for symbol, _, total in pending:
+                    self._flushed[symbol] = total
+        return len(docs)
+
+    def _run(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except PyMongoError as e:
+                logger.warning("Tick flush error: %s", e)
@@ -0,0 +1,48 @@
+import hashlib
+import os
+from collections import namedtuple
+from services.quote_cache import QuoteCache
+from utils.metrics import registry
+
+CachedBody = namedtuple("CachedBody", ["body", "etag", "headers"])
+
+
+class UserCache:
+    """Per-user read-through cache of serialized GET bodies with their ETags.
+
+    Entries are keyed by (kind, email) and live for ``ttl`` seconds; the
+    write handlers for a kind invalidate the user's entry, so a user always
+    reads their own writes. Bodies are stored already encoded, so a hit
+    costs neither a Mongo read nor JSON serialization, and a matching
+    ``If-None-Match`` can be answered from the ETag alone.
+    """
+
+    def __init__(self, ttl=10, maxsize=10000):
+        self._cache = QuoteCache(ttl=ttl, maxsize=maxsize)
+
+    def get(self, kind, email, render):
+        """CachedBody for ``kind`` of ``email``; ``render()`` returns (body bytes, headers) on a miss"""
+        return self._cache.get((kind, email), lambda key: self._entry(*render()))
+
+    def invalidate(self, email, *kinds):
+        for kind in kinds:
+            self._cache.invalidate((kind, email))
+
+    def stats(self):
+        return self._cache.stats()
+
+    @staticmethod
+    def _entry(body, headers):
+        # The ETag is a content hash, so a reload that finds no change still matches
+        return CachedBody(body, hashlib.blake2b(body, digest_size=16).hexdigest(), headers)
+
+
+user_cache = UserCache(
+    ttl=float(os.getenv("USER_CACHE_TTL", 10)),
+    maxsize=int(os.getenv("USER_CACHE_SIZE", 10000))
+)
+
+registry.counter("user_cache_lookups_total", "Per-user response cache lookups by result",
+                 labels=("result",)).set_function(
+    lambda: {(result,): count for result, count in user_cache.stats().items()
+             if result in ("hits", "misses", "coalesced")})
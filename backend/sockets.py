@@ -0,0 +1,87 @@
+"""Socket.IO handlers and the shared price fan-out of the web process"""
+import os
+import logging
+from flask import request
+
+from services.alert_index import alert_index
+from services.poll_scheduler import PollScheduler
+from services.price_hub import PriceHub
+from services.quote_service import get_prices, quote_cache, rate_governor, tick_store
+from services.rate_governor import PRIORITY_UI
+from utils.extensions import socketio
+from utils.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+# Store connected clients and their rooms
+connected_clients = {}
+
+ADAPTIVE_POLLING = os.getenv("ADAPTIVE_POLLING", "true").lower() == "true"
+
+# Watched symbols are polled as their market hours, alert distance and
+# audience warrant, within the Alpha Vantage budget
+hub_scheduler = PollScheduler(
+    budget_per_minute=lambda: rate_governor.rate * 60,
+    volatility=tick_store.volatility,
+    distance=alert_index.distance,
+    base_interval=10,
+    subscriber_interval=float(os.getenv("POLL_SUBSCRIBER_INTERVAL", 10)),
+    name="hub"
+) if ADAPTIVE_POLLING else None
+
+# One poll loop for every watched symbol; changed prices go out as one batched frame per client
+price_hub = PriceHub(
+    socketio,
+    lambda symbols: get_prices(symbols, PRIORITY_UI),
+    interval=10,
+    broadcast_interval=float(os.getenv("BROADCAST_INTERVAL", 1)),
+    epsilon=float(os.getenv("BROADCAST_EPSILON", 0)),
+    scheduler=hub_scheduler
+)
+if hub_scheduler is not None:
+    hub_scheduler.subscribers = price_hub.subscriber_count
+
+registry.gauge("active_sockets", "Connected Socket.IO clients").set_function(lambda: len(connected_clients))
+registry.gauge("symbol_subscribers", "Subscribed sockets per symbol", labels=("symbol",)).set_function(
+    lambda: {(symbol,): count for symbol, count in price_hub.stats()["symbols"].items()})
+registry.counter("broadcast_frames_total", "Batched price frames by outcome", labels=("result",)).set_function(
+    lambda: {("sent",): price_hub.frames_sent, ("skipped",): price_hub.frames_skipped})
+
+@socketio.on_error_default
+def default_error_handler(e):
+    logger.exception("WebSocket error: %s", e)
+
+@socketio.on('connect')
+def handle_connect():
+    logger.debug("Client connected: %s", request.sid)
+    connected_clients[request.sid] = True
+
+@socketio.on('disconnect')
+def handle_disconnect():
+    logger.debug("Client disconnected: %s", request.sid)
+    price_hub.disconnect(request.sid)
+    if request.sid in connected_clients:
+        del connected_clients[request.sid]
+
+@socketio.on('subscribe_stocks')
+def handle_subscribe(data):
+    symbols = data.get("symbols", [])
+    encoding = "msgpack" if data.get("encoding") == "msgpack" else "json"
+    logger.debug("Client %s subscribed to: %s", request.sid, symbols)
+
+    # Fetch initial prices, in one batch, only for symbols no poller has a price for yet
+    missing = [symbol for symbol in price_hub.subscribe(request.sid, symbols, encoding)
+               if price_hub.last_price(symbol) is None]
+    if missing:
+        prices = get_prices(missing, PRIORITY_UI)
+        for symbol in missing:
+            # Fall back to the last known price when the rate governor refused a refresh
+            price_hub.observe(symbol, prices.get(symbol) or quote_cache.stale(symbol))
+    # Deliver the initial prices as one frame instead of waiting for the next batch
+    price_hub.push(request.sid)
+
+@socketio.on('unsubscribe_stocks')
+def handle_unsubscribe(data):
+    symbols = data.get("symbols", [])
+    logger.debug("Client %s unsubscribed from: %s", request.sid, symbols)
+    price_hub.unsubscribe(request.sid, symbols)
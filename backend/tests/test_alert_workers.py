@@ -0,0 +1,218 @@
+"""Several ``worker.py`` processes against one mongod.
+
+Checks that sharded workers evaluate and fire every alert exactly once, and
+that the shards of a worker that dies are picked up by the others once its
+leases expire. Needs a MongoDB server: ``MONGO_TEST_URI`` names one (the
+test creates and drops a database of its own), otherwise a throwaway
+single-node replica set is started from ``mongod`` on PATH. Skipped when
+neither is available.
+
+    python -m pytest tests
+"""
+import os
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from collections import Counter
+from datetime import datetime
+
+import pytest
+from pymongo import MongoClient
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+
+from bench.mock_alpha_vantage import MockAlphaVantage, base_price  # noqa: E402
+from bench.smtp_sink import SmtpSink  # noqa: E402
+from migrate import migrate  # noqa: E402
+from services.shard_lease import shard_for  # noqa: E402
+
+SHARDS = 8
+LEASE_TTL = 3
+
+
+def free_port():
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+def wait_until(predicate, timeout, interval=0.2):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(interval)
+    return predicate()
+
+
+@pytest.fixture(scope="module")
+def mongo_server():
+    """Base URI of a MongoDB server, without a database name"""
+    uri = os.getenv("MONGO_TEST_URI")
+    if uri:
+        yield uri
+        return
+    if shutil.which("mongod") is None:
+        pytest.skip("needs MONGO_TEST_URI or mongod on PATH")
+    dbpath = tempfile.mkdtemp(prefix="alert-workers-")
+    port = free_port()
+    process = subprocess.Popen(["mongod", "--dbpath", dbpath, "--port", str(port), "--bind_ip", "127.0.0.1",
+                                "--replSet", "rs0", "--quiet"],
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    uri = f"mongodb://127.0.0.1:{port}"
+    client = MongoClient(uri, directConnection=True, serverSelectionTimeoutMS=500)
+    try:
+        assert wait_until(lambda: _ping(client), timeout=30), "mongod did not start"
+        # A single-node replica set, so the workers follow alerts through change streams
+        client.admin.command("replSetInitiate",
+                             {"_id": "rs0", "members": [{"_id": 0, "host": f"127.0.0.1:{port}"}]})
+        assert wait_until(lambda: client.admin.command("hello").get("isWritablePrimary"), timeout=30)
+        yield f"{uri}/?directConnection=true"
+    finally:
+        client.close()
+        process.terminate()
+        process.wait(timeout=30)
+        shutil.rmtree(dbpath, ignore_errors=True)
+
+
+def _ping(client):
+    try:
+        client.admin.command("ping")
+        return True
+    except Exception:
+        return False
+
+
+@pytest.fixture
+def cluster(mongo_server, tmp_path):
+    """A fresh database, mock Alpha Vantage and SMTP sink, and a way to start workers on them"""
+    name = f"alert_workers_{uuid.uuid4().hex[:8]}"
+    base, _, query = mongo_server.partition("?")
+    uri = f"{base.rstrip('/')}/{name}" + (f"?{query}" if query else "")
+    client = MongoClient(uri)
+    db = client.get_default_database()
+    migrate(db)
+    mock = MockAlphaVantage(volatility=0.0005).start()
+    sink = SmtpSink().start()
+    host, port = sink.address
+    env = {
+        **os.environ,
+        "MONGO_URI": uri,
+        "ALPHA_VANTAGE_URL": mock.url,
+        "ALPHA_VANTAGE_KEY": "test",
+        "ALPHA_VANTAGE_RATE_PER_MINUTE": "100000",
+        "QUOTE_CACHE_TTL": "0.5",
+        "SMTP_HOST": host,
+        "SMTP_PORT": str(port),
+        "SMTP_STARTTLS": "false",
+        "EMAIL_USER": "alerts@test.local",
+        "EMAIL_PASS": "",
+        "EMAIL_DIGEST_WINDOW": "0",
+        "ALERT_SYNC_POLL_INTERVAL": "0.5",
+        "TICK_FLUSH_INTERVAL": "0",
+        "LOG_LEVEL": "INFO",
+    }
+    workers = {}
+
+    def start(worker_id):
+        log = open(tmp_path / f"{worker_id}.log", "w")
+        workers[worker_id] = subprocess.Popen(
+            [sys.executable, "worker.py", "--shards", str(SHARDS), "--lease-ttl", str(LEASE_TTL),
+             "--interval", "1", "--fixed-interval", "--worker-id", worker_id],
+            cwd=BACKEND, env=env, stdout=log, stderr=subprocess.STDOUT)
+        return workers[worker_id]
+
+    yield db, sink, start, workers
+    for process in workers.values():
+        if process.poll() is None:
+            process.send_signal(signal.SIGINT)
+    for process in workers.values():
+        try:
+            process.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            process.kill()
+    sink.stop()
+    mock.stop()
+    client.drop_database(name)
+    client.close()
+
+
+def lease_owners(db):
+    """{shard: owner} for every shard with a live lease"""
+    now = datetime.utcnow()
+    return {doc["_id"]: doc["owner"]
+            for doc in db.alert_leases.find({"owner": {"$ne": None}, "expires_at": {"$gt": now}})}
+
+
+def settled(db, workers):
+    """Every shard leased, and only by live workers, with each worker holding some"""
+    owners = lease_owners(db)
+    live = {worker_id for worker_id, process in workers.items() if process.poll() is None}
+    return len(owners) == SHARDS and set(owners.values()) == live
+
+
+def seed_alerts(db, symbols, per_symbol=2):
+    """Untriggered "above" alerts far under each symbol's price, so every one fires on its first check"""
+    now = datetime.utcnow()
+    alerts = [{
+        "email": f"user{i}@test.local",
+        "symbol": symbol,
+        "condition": "above",
+        "target_price": round(base_price(symbol) * 0.5 - i * 0.01, 2),
+        "triggered": False,
+        "created_at": now,
+        "updated_at": now,
+    } for symbol in symbols for i in range(per_symbol)]
+    db.alerts.insert_many(alerts)
+    return alerts
+
+
+def assert_fired_once(db, sink, alerts, timeout):
+    ids = [alert["_id"] for alert in alerts]
+    assert wait_until(lambda: db.alerts.count_documents({"_id": {"$in": ids}, "triggered": True}) == len(ids),
+                      timeout), "not every alert fired"
+    assert sink.wait_for(len(alerts), timeout=timeout), "not every firing was emailed"
+    # Give a duplicate firing from another worker's cycle time to show up
+    time.sleep(LEASE_TTL)
+    history = Counter((row["email"], row["symbol"], row["target_price"])
+                      for row in db.alert_history.find())
+    assert history == Counter((alert["email"], alert["symbol"], alert["target_price"]) for alert in alerts)
+    assert sink.messages == len(alerts)
+
+
+def test_workers_fire_each_alert_once(cluster):
+    db, sink, start, workers = cluster
+    for n in range(3):
+        start(f"worker-{n}")
+    assert wait_until(lambda: settled(db, workers), timeout=6 * LEASE_TTL), lease_owners(db)
+    assert len(set(lease_owners(db).values())) == 3
+
+    alerts = seed_alerts(db, [f"SYM{n}" for n in range(40)])
+    assert_fired_once(db, sink, alerts, timeout=30)
+
+
+def test_dead_worker_shards_are_taken_over(cluster):
+    db, sink, start, workers = cluster
+    for n in range(3):
+        start(f"worker-{n}")
+    assert wait_until(lambda: settled(db, workers), timeout=6 * LEASE_TTL), lease_owners(db)
+
+    # SIGKILL: the worker neither releases its leases nor leaves the worker list
+    victim = lease_owners(db)[0]
+    shards = {shard for shard, owner in lease_owners(db).items() if owner == victim}
+    workers[victim].kill()
+    workers[victim].wait()
+
+    candidates = (f"SYM{n}" for n in range(10000))
+    symbols = [symbol for symbol in candidates if shard_for(symbol, SHARDS) in shards][:20]
+    alerts = seed_alerts(db, symbols)
+    # Leases lapse after LEASE_TTL; survivors claim them on their next heartbeat
+    assert wait_until(lambda: settled(db, workers), timeout=6 * LEASE_TTL), lease_owners(db)
+    assert victim not in lease_owners(db).values()
+    assert_fired_once(db, sink, alerts, timeout=30)
@@ -0,0 +1,84 @@
+"""NDJSON exports of the alert and history lists, streamed through the Flask test client on mongomock."""
+import json
+import os
+import sys
+from datetime import datetime, timedelta
+from unittest import mock
+
+import flask_pymongo
+import mongomock
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app  # noqa: E402
+from flask_jwt_extended import create_access_token  # noqa: E402
+from utils.extensions import mongo  # noqa: E402
+
+EMAIL = "export@test.local"
+
+
+@pytest.fixture
+def client():
+    """Test client and auth headers for an app on a fresh mongomock database"""
+    db_client = mongomock.MongoClient()
+    with mock.patch.object(flask_pymongo, "MongoClient", lambda *args, **kwargs: db_client):
+        app = create_app({
+            "MONGO_URI": "mongodb://localhost:27017/export",
+            "JWT_SECRET_KEY": "export-test-secret-key-of-sufficient-length",
+        })
+    with app.app_context():
+        headers = {"Authorization": f"Bearer {create_access_token(identity=EMAIL)}"}
+    yield app.test_client(), headers
+
+
+def read_ndjson(response):
+    assert response.status_code == 200
+    assert response.mimetype == "application/x-ndjson"
+    # Reading the body runs the generator, after the view has returned
+    return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+
+def test_alerts_export(client):
+    test_client, headers = client
+    now = datetime.utcnow()
+    mongo.db.alerts.insert_many([{
+        "email": EMAIL,
+        "symbol": f"SYM{n}",
+        "condition": "above",
+        "target_price": 100.0 + n,
+        "triggered": False,
+        "created_at": now,
+        "updated_at": now,
+    } for n in range(1200)] + [{
+        "email": "someone-else@test.local",
+        "symbol": "OTHER",
+        "condition": "below",
+        "target_price": 1.0,
+        "triggered": False,
+        "created_at": now,
+        "updated_at": now,
+    }])
+
+    rows = read_ndjson(test_client.get("/api/alerts?format=ndjson", headers=headers))
+    # More than one cursor batch, oldest first, and only the caller's alerts
+    assert [row["symbol"] for row in rows] == [f"SYM{n}" for n in range(1200)]
+    assert rows[0]["target_price"] == 100.0
+
+
+def test_history_export(client):
+    test_client, headers = client
+    now = datetime.utcnow()
+    mongo.db.alert_history.insert_many([{
+        "email": EMAIL,
+        "symbol": "AAPL",
+        "target_price": None,
+        "actual_price": 150.0 + n,
+        "condition": "pct_change",
+        "params": {"window": 3600.0, "threshold": -5.0},
+        "triggered_at": now - timedelta(minutes=n),
+    } for n in range(3)])
+
+    rows = read_ndjson(test_client.get("/api/alert-history?format=ndjson", headers=headers))
+    assert [row["actual_price"] for row in rows] == [150.0, 151.0, 152.0]
+    assert rows[0]["params"] == {"window": 3600.0, "threshold": -5.0}
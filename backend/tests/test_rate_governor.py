@@ -0,0 +1,62 @@
+"""RateGovernor shares: every priority stays reachable however many processes split the key."""
+import os
+import sys
+
+import mongomock
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.rate_governor import PRIORITY_ALERT, PRIORITY_SEARCH, PRIORITY_UI, RateGovernor  # noqa: E402
+from services.rate_share import RateShare  # noqa: E402
+
+PRIORITIES = (PRIORITY_ALERT, PRIORITY_UI, PRIORITY_SEARCH)
+
+
+def shared_governors(count, rate_per_minute=5):
+    holders = mongomock.MongoClient().db.quote_clients
+    governors = [RateGovernor(rate_per_minute) for _ in range(count)]
+    shares = [RateShare(governor, f"process-{n}") for n, governor in enumerate(governors)]
+    for share in shares:
+        share.holders = holders
+    # Twice round, so every process sees every other one
+    for _ in range(2):
+        for share in shares:
+            share.heartbeat()
+    return governors
+
+
+@pytest.mark.parametrize("count", [1, 4, 5, 6, 20])
+def test_full_bucket_grants_every_priority(count):
+    for governor in shared_governors(count):
+        assert governor.rate == pytest.approx(5 / 60 / count)
+        for priority in PRIORITIES:
+            assert governor.retry_after(priority) == 0.0
+        # Highest reserve first, so each grant leaves room for the next priority down
+        for priority in reversed(PRIORITIES):
+            assert governor.try_acquire(priority), priority
+
+
+@pytest.mark.parametrize("count", [1, 6, 20])
+def test_drained_bucket_reports_finite_wait(count):
+    governor = shared_governors(count)[0]
+    while governor.try_acquire(PRIORITY_ALERT):
+        pass
+    for priority in PRIORITIES:
+        wait = governor.retry_after(priority)
+        assert 0 < wait < float("inf")
+        # Refill at the shared rate: one token per count * 12s at 5/min
+        assert wait <= (governor.reserves[priority] + 1) * count * 12 + 1e-6
+
+
+def test_unreachable_reserve_reports_infinite_wait():
+    governor = RateGovernor(5)
+    governor.reserves[PRIORITY_SEARCH] = governor.capacity
+    assert governor.retry_after(PRIORITY_SEARCH) == float("inf")
+    assert not governor.try_acquire(PRIORITY_SEARCH)
+
+
+def test_reserves_never_exceed_the_bucket():
+    governor = RateGovernor(1, reserves={PRIORITY_ALERT: 0, PRIORITY_SEARCH: 3})
+    assert governor.capacity >= 4
+    assert governor.try_acquire(PRIORITY_SEARCH)
@@ -1,5 +1,8 @@
 from flask_pymongo import PyMongo
 from flask_jwt_extended import JWTManager
+from flask_socketio import SocketIO
 
+# Unbound until create_app() calls init_app on them
 mongo = PyMongo()
-jwt = JWTManager()
\ No newline at end of file
+jwt = JWTManager()
+socketio = SocketIO()
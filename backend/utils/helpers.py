@@ -1,20 +1,65 @@
-import smtplib
+import base64
+import binascii
 from email.mime.text import MIMEText
-import os
+from email.utils import formataddr
 
-def send_alert_email(to_email, symbol, price):
+def encode_cursor(*parts):
+    """Opaque pagination token holding the sort key of the last item on a page"""
+    return base64.urlsafe_b64encode("|".join(map(str, parts)).encode()).decode().rstrip("=")
+
+def decode_cursor(token, count=1):
+    """The ``count`` sort key strings inside an ``encode_cursor`` token; ValueError if malformed"""
+    try:
+        parts = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)).decode().split("|")
+    except (binascii.Error, UnicodeDecodeError):
+        raise ValueError("Invalid cursor")
+    if len(parts) != count:
+        raise ValueError("Invalid cursor")
+    return parts
+
+def describe_condition(condition, target_price=None, params=None):
+    """Plain-English phrase for an alert condition, e.g. price moved -5% within 3600s"""
+    params = params or {}
+    if condition in ("above", "below"):
+        target = f"${target_price}" if target_price is not None else "your target"
+        return f"price is {condition} {target}"
     try:
-        sender = os.getenv("EMAIL_USER")
-        password = os.getenv("EMAIL_PASS")
-        
-        msg = MIMEText(f"Alert! {symbol} reached target price. Current: ${price}")
-        msg['Subject'] = f'Stock Alert: {symbol}'
-        msg['From'] = sender
-        msg['To'] = to_email
-        
-        with smtplib.SMTP("smtp.gmail.com", 587) as server:
-            server.starttls()
-            server.login(sender, password)
-            server.send_message(msg)
-    except Exception as e:
-        print(f"Email failed: {e}")
\ No newline at end of file
+        if condition == "pct_change":
+            return f"price moved {params['threshold']:+g}% within {params['window']:g}s"
+        if condition == "ma_cross":
+            return (f"the {params['short_window']:g}s average crossed {params['direction']} "
+                    f"the {params['long_window']:g}s average")
+        if condition == "high_break":
+            return f"price broke its {params['window']:g}s high"
+        if condition == "low_break":
+            return f"price broke its {params['window']:g}s low"
+        if condition == "volume_spike":
+            return f"volume hit {params['multiplier']:g}x its {params['window']:g}s average"
+    except (KeyError, TypeError, ValueError):
+        pass
+    return f"condition {condition} was met"
+
+def build_alert_message(sender, to_email, alerts, sender_name=None):
+    """Build the email for one or more triggered alerts ({symbol, price, condition, target_price, params})"""
+    if len(alerts) == 1:
+        alert = alerts[0]
+        condition = describe_condition(alert["condition"], alert.get("target_price"), alert.get("params"))
+        subject = f"Stock Alert: {alert['symbol']} {condition}"
+        body = (
+            "Your alert has been triggered!\n"
+            f"Stock: {alert['symbol']}\n"
+            f"Current Price: ${alert['price']}\n"
+            f"Condition: {condition[0].upper()}{condition[1:]}\n"
+        )
+    else:
+        subject = f"Stock Alerts: {len(alerts)} alerts triggered"
+        lines = [f"- {a['symbol']}: ${a['price']} "
+                 f"({describe_condition(a['condition'], a.get('target_price'), a.get('params'))})"
+                 for a in alerts]
+        body = "Your alerts have been triggered!\n" + "\n".join(lines) + "\n"
+
+    msg = MIMEText(body)
+    msg['Subject'] = subject
+    msg['From'] = formataddr((sender_name, sender)) if sender_name else sender
+    msg['To'] = to_email
+    return msg
@@ -0,0 +1,248 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from pymongo import monitoring
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; spans a cached lookup up to a slow upstream call or alert cycle
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class _Metric:
+    """One metric family; each label combination is a series keyed by a tuple"""
+
+    kind = None
+
+    def __init__(self, name, description, labels=()):
+        self.name = name
+        self.description = description
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+        self._series = {}
+        self._function = None
+        if not self.labels:
+            # Unlabelled metrics report zero before their first update
+            self._series[()] = self._initial()
+
+    def _initial(self):
+        return 0
+
+    def set_function(self, function):
+        """Read the value at scrape time: a number, or {label values tuple: number}"""
+        self._function = function
+
+    def _key(self, labels):
+        return tuple(str(labels[name]) for name in self.labels) if self.labels else ()
+
+    def _label_text(self, key, extra=()):
+        pairs = list(zip(self.labels, key)) + list(extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+    def samples(self):
+        if self._function is not None:
+            value = self._function()
+            series = value if isinstance(value, dict) else {(): value}
+            return [(self.name, self._label_text(key if isinstance(key, tuple) else (key,)), number)
+                    for key, number in series.items()]
+        with self._lock:
+            return [(self.name, self._label_text(key), value) for key, value in self._series.items()]
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(f"{name}{labels} {_number(value)}" for name, labels, value in self.samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = self._series.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = self._series.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    """Fixed-bucket histogram; an observation is a bisect and three additions"""
+
+    kind = "histogram"
+
+    def __init__(self, name, description, labels=(), buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, description, labels)
+
+    def _initial(self):
+        # [per-bucket counts (last one is +Inf), sum, count]
+        return [[0] * (len(self.buckets) + 1), 0.0, 0]
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        slot = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = self._initial()
+            series[0][slot] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self):
+        samples = []
+        with self._lock:
+            series = [(key, list(counts), total, count) for key, (counts, total, count) in self._series.items()]
+        for key, counts, total, count in series:
+            cumulative = 0
+            for bound, bucket in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket
+                samples.append((f"{self.name}_bucket", self._label_text(key, [("le", _number(bound))]), cumulative))
+            samples.append((f"{self.name}_sum", self._label_text(key), total))
+            samples.append((f"{self.name}_count", self._label_text(key), count))
+        return samples
+
+
+class Registry:
+    """Process-wide set of metrics rendered in the Prometheus text format"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, cls, name, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            return metric
+
+    def counter(self, name, description, labels=()):
+        return self._register(Counter, name, description, labels)
+
+    def gauge(self, name, description, labels=()):
+        return self._register(Gauge, name, description, labels)
+
+    def histogram(self, name, description, labels=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram, name, description, labels, buckets=buckets)
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        blocks = []
+        for metric in metrics:
+            try:
+                blocks.append(metric.render())
+            except Exception:
+                # A failing scrape-time callback must not take the whole page down
+                continue
+        return "\n".join(blocks) + "\n"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value)) if abs(value) < 1e15 else repr(value)
+    return str(value)
+
+
+registry = Registry()
+
+# Shared metrics for the hot paths; services import the ones they update
+ALERT_CYCLE_SECONDS = registry.histogram("alert_cycle_seconds", "Duration of one alert check cycle")
+ALERTS_EVALUATED = registry.counter("alerts_evaluated_total", "Alerts on the symbols priced by check cycles")
+ALERTS_FIRED = registry.counter("alerts_fired_total", "Alerts fired and committed")
+ALERT_CYCLE_ERRORS = registry.counter("alert_cycle_errors_total", "Alert check cycles that failed")
+UPSTREAM_SECONDS = registry.histogram("upstream_request_seconds", "Alpha Vantage request latency",
+                                      labels=("endpoint",))
+UPSTREAM_ERRORS = registry.counter("upstream_errors_total", "Failed Alpha Vantage requests",
+                                   labels=("endpoint",))
+UPSTREAM_RATE_LIMITED = registry.counter(
+    "upstream_rate_limited_total",
+    "Alpha Vantage calls refused by the local governor or answered with a rate-limit note",
+    labels=("endpoint", "source"))
+EMAIL_SEND_SECONDS = registry.histogram("email_send_seconds", "SMTP send latency per message")
+BROADCAST_FLUSH_SECONDS = registry.histogram("broadcast_flush_seconds", "Time to send one batched frame to every client")
+HTTP_REQUEST_SECONDS = registry.histogram("http_request_seconds", "REST request latency",
+                                          labels=("endpoint", "method", "status"))
+MONGO_COMMAND_SECONDS = registry.histogram("mongo_command_seconds", "MongoDB command latency",
+                                           labels=("command",))
+MONGO_COMMAND_ERRORS = registry.counter("mongo_command_errors_total", "Failed MongoDB commands",
+                                        labels=("command",))
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """PyMongo command listener feeding the mongo_command_* metrics.
+
+    Pass it as ``event_listeners=[mongo_command_metrics]`` when creating a client.
+    """
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        MONGO_COMMAND_SECONDS.observe(event.duration_micros / 1e6, command=event.command_name)
+
+    def failed(self, event):
+        MONGO_COMMAND_SECONDS.observe(event.duration_micros / 1e6, command=event.command_name)
+        MONGO_COMMAND_ERRORS.inc(command=event.command_name)
+
+
+mongo_command_metrics = MongoCommandMetrics()
+
+
+def start_http_server(port, host="0.0.0.0"):
+    """Serve /metrics on its own port, for processes without a Flask app"""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            payload = registry.render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
@@ -0,0 +1,89 @@
+"""Standalone alert checker process.
+
+Run one or more of these next to the web server:
+
+    python worker.py --shards 16
+
+Each process claims a share of the symbol hash ranges through lease
+documents in MongoDB, so N processes split alert evaluation between them
+without firing the same alert twice.
+"""
+import argparse
+import logging
+import os
+import socket
+from dotenv import load_dotenv
+
+# Load config before the services read their settings from the environment
+load_dotenv()
+
+from pymongo import MongoClient
+from services.alert_index import AlertIndex
+from services.alert_service import AlertChecker
+from services.alert_sync import AlertIndexSync
+from services.poll_scheduler import PollScheduler
+from services.quote_service import rate_governor, rate_share, tick_store
+from services.shard_lease import ShardLeaseManager
+from utils.log import configure_logging
+from utils.metrics import mongo_command_metrics, start_http_server
+
+logger = logging.getLogger(__name__)
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the alert checker")
+    parser.add_argument("--shards", type=int, default=int(os.getenv("ALERT_SHARDS", 16)),
+                        help="number of symbol hash ranges shared between workers")
+    parser.add_argument("--lease-ttl", type=float, default=float(os.getenv("ALERT_LEASE_TTL", 30)),
+                        help="seconds a shard lease lives without a heartbeat")
+    parser.add_argument("--interval", type=float, default=float(os.getenv("ALERT_CHECK_INTERVAL", 60)),
+                        help="seconds between alert cycles, or the base poll interval when adaptive")
+    parser.add_argument("--fixed-interval", dest="adaptive", action="store_false",
+                        default=os.getenv("ADAPTIVE_POLLING", "true").lower() == "true",
+                        help="check every symbol each interval instead of scheduling polls per symbol")
+    parser.add_argument("--worker-id", default=f"{socket.gethostname()}:{os.getpid()}")
+    parser.add_argument("--metrics-port", type=int, default=int(os.getenv("METRICS_PORT", 0)),
+                        help="serve Prometheus metrics on this port (0 disables)")
+    args = parser.parse_args()
+    configure_logging()
+
+    if args.metrics_port:
+        start_http_server(args.metrics_port)
+
+    db = MongoClient(os.getenv("MONGO_URI"), event_listeners=[mongo_command_metrics]).get_default_database()
+
+    leases = ShardLeaseManager(db.alert_leases, db.alert_workers, args.worker_id,
+                               shard_count=args.shards, lease_ttl=args.lease_ttl)
+    leases.heartbeat()
+    leases.start()
+
+    tick_store.bind(db.ticks)
+    rate_share.bind(db.quote_clients)
+
+    alert_index = AlertIndex()
+    alert_sync = AlertIndexSync(db.alerts, alert_index,
+                                poll_interval=float(os.getenv("ALERT_SYNC_POLL_INTERVAL", 5)))
+    alert_sync.load()
+    alert_sync.start()
+
+    scheduler = None
+    if args.adaptive:
+        scheduler = PollScheduler(
+            budget_per_minute=lambda: rate_governor.rate * 60,
+            volatility=tick_store.volatility,
+            distance=alert_index.distance,
+            base_interval=args.interval
+        )
+    checker = AlertChecker(db, alert_index, leases=leases, interval=args.interval, scheduler=scheduler)
+    logger.info("Alert worker %s holding shards %s", args.worker_id, leases.owned_shards())
+    try:
+        checker.run_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        leases.stop()
+        rate_share.stop()
+        tick_store.flush()
+        checker.notifier.join()
+
+if __name__ == "__main__":
+    main()
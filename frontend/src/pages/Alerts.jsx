@@ -2,6 +2,30 @@ import React, { useState, useEffect } from "react";
 import { toast } from "react-hot-toast";
 import api from "../utils/api";
 
+// Plain-English condition, e.g. "price is above $150" or "price moved -5% within 3600s"
+const describeCondition = ({ condition, target_price, params }) => {
+  if (condition === "above" || condition === "below") {
+    return `price is ${condition} $${target_price}`;
+  }
+  // History rows written before params were recorded have none
+  if (!params) return `condition ${condition} was met`;
+  const p = params;
+  switch (condition) {
+    case "pct_change":
+      return `price moved ${p.threshold > 0 ? "+" : ""}${p.threshold}% within ${p.window}s`;
+    case "ma_cross":
+      return `the ${p.short_window}s average crossed ${p.direction} the ${p.long_window}s average`;
+    case "high_break":
+      return `price broke its ${p.window}s high`;
+    case "low_break":
+      return `price broke its ${p.window}s low`;
+    case "volume_spike":
+      return `volume hit ${p.multiplier}x its ${p.window}s average`;
+    default:
+      return `condition ${condition} was met`;
+  }
+};
+
 const Alerts = () => {
   const [activeTab, setActiveTab] = useState("active");
   const [alerts, setAlerts] = useState([]);
@@ -11,15 +35,27 @@ const Alerts = () => {
   const [condition, setCondition] = useState("above");
   const [isLoading, setIsLoading] = useState(false);
 
+  // Alerts come in pages; follow X-Next-Cursor until every one is loaded
+  const fetchAllAlerts = async () => {
+    const all = [];
+    let cursor;
+    do {
+      const response = await api.get("/alerts", { params: cursor ? { cursor } : {} });
+      all.push(...response.data);
+      cursor = response.headers["x-next-cursor"];
+    } while (cursor);
+    return all;
+  };
+
   // Fetch all alert data
   const fetchData = async () => {
     try {
       setIsLoading(true);
       const [activeAlerts, alertHistory] = await Promise.all([
-        api.get("/alerts"),
+        fetchAllAlerts(),
         api.get("/alert-history")
       ]);
-      setAlerts(activeAlerts.data);
+      setAlerts(activeAlerts);
       setHistory(alertHistory.data);
     } catch (error) {
       toast.error(error.response?.data?.error || "Failed to fetch alerts");
@@ -170,7 +206,7 @@ const Alerts = () => {
                   >
                     <div>
                       <span className="font-medium">{alert.symbol}</span> - Alert
-                      when price is {alert.condition} ${alert.target_price}
+                      when {describeCondition(alert)}
                       {alert.triggered && (
                         <span className="ml-2 text-green-600">(Triggered)</span>
                       )}
@@ -206,7 +242,7 @@ const Alerts = () => {
                     </span>
                   </div>
                   <div className="mt-1">
-                    Triggered when price was <strong>{alert.condition}</strong> ${alert.target_price}
+                    Triggered when <strong>{describeCondition(alert)}</strong>
                   </div>
                   <div className="mt-1 text-green-600">
                     Actual price: ${alert.actual_price}
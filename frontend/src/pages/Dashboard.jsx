@@ -39,8 +39,11 @@ export default function Dashboard() {
       console.log("Connection error:", err);
     });
 
-    newSocket.on("stock_update", (data) => {
-      setStockData((prev) => ({ ...prev, [data.symbol]: data.price }));
+    // One frame per interval carrying only the symbols whose price changed;
+    // acking it lets the server send the next one
+    newSocket.on("stock_batch", (frame, ack) => {
+      setStockData((prev) => ({ ...prev, ...frame.prices }));
+      if (ack) ack();
     });
 
     fetchWatchlist();